@@ -0,0 +1,156 @@
+"""Benchmark insertion of Grapher data_values: former row-wise `executemany` against bulk-load methods.
+
+Inserts the data values of a grapher file in a scratch database with each method, reports throughput (rows per
+second) and checks that all methods store the same values. Requires a local MySQL/MariaDB server, e.g.:
+
+    docker run -d --name grapher-bench -p 3306:3306 -e MARIADB_ROOT_PASSWORD=bench mariadb:10.6
+
+(with MySQL 8, start the server with `--local-infile=1`).
+
+Usage:
+
+    python benchmarks/grapher_import.py [--csv PATH] [--host HOST] [--port PORT] [--user USER] [--password PASSWORD]
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+import pymysql
+
+from cowidev.utils.utils import get_project_dir
+from cowidev.grapher.db.utils.db_utils import DBUtils
+from cowidev.grapher.db.utils.db_imports import (
+    chunk_df,
+    get_data_values,
+    insert_data_values,
+    _insert_multirow,
+)
+
+
+DATABASE = "grapher_import_benchmark"
+TABLE = """
+    CREATE TABLE data_values (
+        value VARCHAR(255) NOT NULL,
+        year INT NOT NULL,
+        entityId INT NOT NULL,
+        variableId INT NOT NULL,
+        PRIMARY KEY (variableId, entityId, year)
+    )
+"""
+
+
+def insert_legacy(db, df, entity_id_by_name, variable_id_by_name):
+    id_names = ["Country", "Year"]
+    variable_names = list(set(df.columns) - set(id_names))
+    df_data_values = df.melt(
+        id_vars=id_names,
+        value_vars=variable_names,
+        var_name="variable",
+        value_name="value",
+    ).dropna(how="any")
+    for df_chunk in chunk_df(df_data_values, 50000):
+        data_values = [
+            (
+                row["value"],
+                int(row["Year"]),
+                entity_id_by_name[row["Country"]],
+                variable_id_by_name[row["variable"]],
+            )
+            for _, row in df_chunk.iterrows()
+        ]
+        db.upsert_many(
+            """
+            INSERT INTO
+                data_values (value, year, entityId, variableId)
+            VALUES
+                (%s, %s, %s, %s)
+        """,
+            data_values,
+        )
+
+
+def insert_executemany(db, df, entity_id_by_name, variable_id_by_name):
+    data_values = get_data_values(df, entity_id_by_name, variable_id_by_name)
+    insert_data_values(db, data_values, bulk_load=False)
+
+
+def insert_multirow(db, df, entity_id_by_name, variable_id_by_name):
+    data_values = get_data_values(df, entity_id_by_name, variable_id_by_name)
+    _insert_multirow(db, data_values, chunksize=50000)
+
+
+def insert_load_data(db, df, entity_id_by_name, variable_id_by_name):
+    data_values = get_data_values(df, entity_id_by_name, variable_id_by_name)
+    method = insert_data_values(db, data_values, bulk_load=True)
+    if method != "load data":
+        raise ValueError("LOAD DATA LOCAL INFILE is not allowed by the server")
+
+
+METHODS = {
+    "iterrows + executemany (legacy)": insert_legacy,
+    "executemany": insert_executemany,
+    "multi-row insert": insert_multirow,
+    "load data": insert_load_data,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--csv",
+        default=os.path.join(get_project_dir(), "scripts", "grapher", "COVID-19 - Vaccinations.csv"),
+        help="Path to grapher file.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="bench")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    entity_id_by_name = {name: i for i, name in enumerate(sorted(df["Country"].unique()), start=1)}
+    variable_id_by_name = {name: i for i, name in enumerate(df.columns.drop(["Country", "Year"]), start=1)}
+
+    connection = pymysql.connect(
+        host=args.host,
+        port=args.port,
+        user=args.user,
+        password=args.password,
+        charset="utf8mb4",
+        autocommit=False,
+        local_infile=True,
+    )
+    cursor = connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {DATABASE}")
+    cursor.execute(f"CREATE DATABASE {DATABASE}")
+    cursor.execute(f"USE {DATABASE}")
+    cursor.execute(TABLE)
+    db = DBUtils(cursor)
+
+    results = {}
+    checksums = {}
+    try:
+        for name, insert in METHODS.items():
+            db.execute("TRUNCATE TABLE data_values")
+            t0 = time.perf_counter()
+            insert(db, df, entity_id_by_name, variable_id_by_name)
+            connection.commit()
+            elapsed = time.perf_counter() - t0
+            (rows,) = db.fetch_one("SELECT COUNT(*) FROM data_values")
+            checksums[name] = db.fetch_one(
+                "SELECT BIT_XOR(CRC32(CONCAT_WS(',', value, year, entityId, variableId))) FROM data_values"
+            )
+            results[name] = {"rows": rows, "time (sec)": elapsed, "rows/sec": rows / elapsed}
+    finally:
+        cursor.execute(f"DROP DATABASE IF EXISTS {DATABASE}")
+        connection.close()
+
+    print(pd.DataFrame(results).T.round(2))
+    if len(set(checksums.values())) > 1:
+        raise ValueError(f"Stored values differ between methods: {checksums}")
+    print("All methods store the same values.")
+
+
+if __name__ == "__main__":
+    main()
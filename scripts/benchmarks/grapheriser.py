@@ -0,0 +1,93 @@
+"""Benchmark streaming Grapheriser (`block_size`) against processing the complete input in memory.
+
+Generates a long-format input (one row per location, date and category, as pivoted for Google Mobility or variants
+grapher files), unless one is given with `--input`. Runs each mode in a separate process, reports wall time and peak
+resident set size (RSS) of the process, and checks that both output files are identical.
+
+Usage:
+
+    python benchmarks/grapheriser.py [--input PATH] [--locations N] [--days N] [--categories N] [--block-size N]
+"""
+import argparse
+import filecmp
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from cowidev.grapher.files import Grapheriser
+
+
+def generate_input(path: str, locations: int, days: int, categories: int):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2020-02-15", periods=days).strftime("%Y-%m-%d")
+    for i in range(locations):
+        df = pd.DataFrame(
+            {
+                "location": f"Location {i}",
+                "date": np.repeat(dates, categories),
+                "category": np.tile([f"category_{j}" for j in range(categories)], days),
+                "value": rng.normal(size=days * categories).round(3),
+            }
+        )
+        # Some values are missing, and some locations lack a category
+        df = df[(rng.random(len(df)) > 0.05) & ((i % 10 != 0) | (df["category"] != "category_0"))]
+        df.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+
+
+def _run(input_path: str, output_path: str, kwargs: dict, queue):
+    t0 = time.perf_counter()
+    Grapheriser(**kwargs).run(input_path, output_path)
+    # ru_maxrss is in kilobytes on Linux
+    queue.put((time.perf_counter() - t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def run(input_path: str, output_path: str, **kwargs) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run, args=(input_path, output_path, kwargs, queue))
+    process.start()
+    elapsed, peak_rss = queue.get()
+    process.join()
+    return {"time (sec)": elapsed, "peak RSS (MB)": peak_rss}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", help="Path to long-format input. Defaults to a generated file.")
+    parser.add_argument("--pivot-column", default="category")
+    parser.add_argument("--pivot-values", default="value")
+    parser.add_argument("--locations", type=int, default=500)
+    parser.add_argument("--days", type=int, default=600)
+    parser.add_argument("--categories", type=int, default=6)
+    parser.add_argument("--block-size", type=int, default=20, help="Number of locations per block.")
+    parser.add_argument("--chunksize", type=int, default=100000, help="Number of input rows read at a time.")
+    args = parser.parse_args()
+
+    kwargs = {"pivot_column": args.pivot_column, "pivot_values": args.pivot_values, "fillna": True}
+    with tempfile.TemporaryDirectory() as folder:
+        input_path = args.input
+        if input_path is None:
+            input_path = os.path.join(folder, "input.csv")
+            generate_input(input_path, args.locations, args.days, args.categories)
+        print(f"Input: {os.path.getsize(input_path) / 1024 ** 2:.1f} MB")
+        output_memory = os.path.join(folder, "memory.csv")
+        output_streaming = os.path.join(folder, "streaming.csv")
+        results = {
+            "in memory": run(input_path, output_memory, **kwargs),
+            "streaming": run(
+                input_path, output_streaming, block_size=args.block_size, chunksize=args.chunksize, **kwargs
+            ),
+        }
+        print(pd.DataFrame(results).T.round(2))
+        if not filecmp.cmp(output_memory, output_streaming, shallow=False):
+            raise ValueError("Outputs differ")
+    print("Outputs are identical.")
+
+
+if __name__ == "__main__":
+    main()
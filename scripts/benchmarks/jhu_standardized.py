@@ -0,0 +1,236 @@
+"""Benchmark JHU `load_standardized` against the former groupby and row-wise implementations of its steps.
+
+Runs every step of `load_standardized` on the full JHU history (`scripts/input/jhu`), with the former and current
+implementations, reports the time of each step and checks that outputs contain the same values.
+
+Usage:
+
+    python benchmarks/jhu_standardized.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+import jhu  # noqa: E402
+import shared  # noqa: E402
+from shared import (  # noqa: E402
+    days_since_spec,
+    doubling_days_spec,
+    drop_population,
+    get_testing,
+    inject_population,
+    rolling_avg_spec,
+)
+
+
+# Former implementations
+def _inject_growth_legacy(df, prefix, periods):
+    cases_colname = "%s_cases" % prefix
+    deaths_colname = "%s_deaths" % prefix
+    cases_growth_colname = "%s_pct_growth_cases" % prefix
+    deaths_growth_colname = "%s_pct_growth_deaths" % prefix
+
+    df[[cases_colname, deaths_colname]] = (
+        df[["location", "new_cases", "new_deaths"]]
+        .fillna(0)
+        .groupby("location")[["new_cases", "new_deaths"]]
+        .rolling(window=periods, min_periods=periods, center=False)
+        .sum()
+        .reset_index(level=0, drop=True)
+    )
+    df[[cases_growth_colname, deaths_growth_colname]] = (
+        df[["location", cases_colname, deaths_colname]]
+        .groupby("location")[[cases_colname, deaths_colname]]
+        .pct_change(periods=periods, fill_method=None)
+        .replace([np.inf, -np.inf], pd.NA)
+        * 100
+    )
+    return df
+
+
+def _pct_change_to_doubling_days_legacy(pct_change, periods):
+    if pd.notnull(pct_change) and pct_change != 0:
+        doubling_days = periods * np.log(2) / np.log(1 + pct_change)
+        return np.round(doubling_days, decimals=2)
+    return pd.NA
+
+
+def inject_doubling_days_legacy(df):
+    for col, spec in doubling_days_spec.items():
+        value_col = spec["value_col"]
+        periods = spec["periods"]
+        df.loc[df[value_col] == 0, value_col] = np.nan
+        df[col] = (
+            df.groupby("location", as_index=False)[value_col]
+            .pct_change(periods=periods, fill_method=None)[value_col]
+            .map(lambda pct: _pct_change_to_doubling_days_legacy(pct, periods))
+        )
+    return df
+
+
+def inject_rolling_avg_legacy(df):
+    df = df.copy().sort_values(by="date")
+    for col, spec in rolling_avg_spec.items():
+        df[col] = df[spec["col"]].astype("float")
+        df[col] = (
+            df.groupby("location")[col]
+            .rolling(window=spec["window"], min_periods=spec["min_periods"], center=spec["center"])
+            .mean()
+            .round(decimals=5)
+            .reset_index(level=0, drop=True)
+        )
+    return df
+
+
+def _apply_row_cfr_100_legacy(row):
+    if pd.notnull(row["total_cases"]) and row["total_cases"] >= 100:
+        return row["cfr"]
+    return pd.NA
+
+
+def inject_cfr_legacy(df):
+    cfr_series = (df["total_deaths"] / df["total_cases"]) * 100
+    df["cfr"] = cfr_series.round(decimals=3)
+    df["cfr_100_cases"] = df.apply(_apply_row_cfr_100_legacy, axis=1)
+
+    shifted_cases = df.sort_values("date").groupby("location")["new_cases_7_day_avg_right"].shift(9)
+    df["cfr_short_term"] = (
+        df["new_deaths_7_day_avg_right"]
+        .div(shifted_cases)
+        .replace(np.inf, np.nan)
+        .replace(-np.inf, np.nan)
+        .mul(100)
+        .round(4)
+    )
+    df.loc[
+        (df.cfr_short_term < 0) | (df.cfr_short_term > 10) | (df.date.astype(str) < "2020-09-01"),
+        "cfr_short_term",
+    ] = pd.NA
+    return df
+
+
+def _days_since_legacy(df, spec):
+    try:
+        ref_date = df["date"][df[spec["value_col"]] >= spec["value_threshold"]].iloc[0]
+    except IndexError:
+        ref_date = None
+    ref_date = pd.to_datetime(ref_date)
+
+    def _date_diff(date):
+        if pd.isnull(date) or pd.isnull(ref_date):
+            return None
+        diff = (date - ref_date).days
+        if spec["positive_only"] and diff < 0:
+            return None
+        return diff
+
+    return pd.to_datetime(df["date"]).map(_date_diff).astype("Int64")
+
+
+def inject_days_since_legacy(df):
+    df = df.copy()
+    for col, spec in days_since_spec.items():
+        df[col] = (
+            df[["date", "location", spec["value_col"]]]
+            .groupby("location")
+            .apply(lambda df_group: _days_since_legacy(df_group, spec))
+            .reset_index(level=0, drop=True)
+        )
+    return df
+
+
+def inject_exemplars_legacy(df):
+    df = inject_population(df)
+
+    def mapper_days_since(row):
+        if pd.notnull(row["population"]) and row["population"] >= 5e6:
+            return row["days_since_100_total_cases"]
+        return pd.NA
+
+    df["days_since_100_total_cases_and_5m_pop"] = df.apply(mapper_days_since, axis=1)
+    countries_with_testing_data = set(get_testing()["location"])
+
+    def mapper_bool(row):
+        if (
+            pd.notnull(row["days_since_100_total_cases"])
+            and pd.notnull(row["population"])
+            and row["days_since_100_total_cases"] >= 21
+            and row["population"] >= 5e6
+            and row["location"] in countries_with_testing_data
+        ):
+            return 1
+        return 0
+
+    df["5m_pop_and_21_days_since_100_cases_and_testing"] = df.apply(mapper_bool, axis=1)
+    return drop_population(df)
+
+
+def _per_million(df):
+    return shared.inject_per_million(df, shared.BASE_MEASURES)
+
+
+# Steps of `load_standardized`: (name, former implementation, current implementation)
+STEPS = [
+    ("inject_owid_aggregates", shared.inject_owid_aggregates, shared.inject_owid_aggregates),
+    ("inject_weekly_growth", lambda df: _inject_growth_legacy(df, "weekly", 7), shared.inject_weekly_growth),
+    ("inject_biweekly_growth", lambda df: _inject_growth_legacy(df, "biweekly", 14), shared.inject_biweekly_growth),
+    ("inject_doubling_days", inject_doubling_days_legacy, shared.inject_doubling_days),
+    ("inject_per_million", _per_million, _per_million),
+    ("inject_rolling_avg", inject_rolling_avg_legacy, shared.inject_rolling_avg),
+    ("inject_cfr", inject_cfr_legacy, shared.inject_cfr),
+    ("inject_days_since", inject_days_since_legacy, shared.inject_days_since),
+    ("inject_exemplars", inject_exemplars_legacy, shared.inject_exemplars),
+]
+
+
+def _run(df, implementation):
+    timings = {}
+    for name, *funcs in STEPS:
+        t0 = time.perf_counter()
+        df = funcs[implementation](df)
+        timings[name] = time.perf_counter() - t0
+    return df.sort_values(by=["location", "date"]).reset_index(drop=True), timings
+
+
+def _as_float(s):
+    return pd.to_numeric(s.astype(object).where(s.notnull(), np.nan)).to_numpy(dtype=float)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+
+    df = jhu._load_merged()
+    df = df[["date", "location", "new_cases", "new_deaths", "total_cases", "total_deaths"]]
+    # Former growth and doubling days steps follow the input order of rows, not their dates
+    df = jhu.discard_rows(df.sort_values(["date", "location"]))
+    print(f"Locations: {df.location.nunique()}, rows: {len(df)}")
+
+    df_legacy, timings_legacy = _run(df.copy(), 0)
+    df_new, timings_new = _run(df.copy(), 1)
+    timings = pd.DataFrame({"legacy (sec)": timings_legacy, "current (sec)": timings_new})
+    timings.loc["total"] = timings.sum()
+    timings["speedup"] = timings["legacy (sec)"] / timings["current (sec)"]
+    print(timings.round(3))
+
+    # Missing values are now NaN/NA in numeric columns instead of pd.NA in object columns
+    assert list(df_legacy.columns) == list(df_new.columns)
+    pd.testing.assert_frame_equal(df_legacy[["date", "location"]], df_new[["date", "location"]])
+    different = [
+        col
+        for col in df_new.columns.drop(["date", "location"])
+        if not np.array_equal(_as_float(df_legacy[col]), _as_float(df_new[col]), equal_nan=True)
+    ]
+    if different:
+        raise ValueError(f"Outputs differ in columns: {different}")
+    print("Outputs contain the same values.")
+
+
+if __name__ == "__main__":
+    main()
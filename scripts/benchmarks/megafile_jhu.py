@@ -0,0 +1,79 @@
+"""Benchmark megafile JHU loader (`get_jhu`) against the former melt-and-merge implementation.
+
+Runs both implementations on the public JHU files, reports wall time, peak memory (allocations traced by
+`tracemalloc`) and size of the output, and checks that outputs contain the same data.
+
+Usage:
+
+    python benchmarks/megafile_jhu.py [--jhu-dir PATH]
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from functools import reduce
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from cowidev.utils.utils import get_project_dir
+from cowidev.megafile.steps.jhu import get_jhu, JHU_VARIABLES, RENAME_WEEKLY
+
+
+def get_jhu_legacy(jhu_dir: str) -> pd.DataFrame:
+    data_frames = []
+    for jhu_var in JHU_VARIABLES:
+        tmp = pd.read_csv(os.path.join(jhu_dir, f"{jhu_var}.csv"))
+        country_cols = list(tmp.columns)
+        country_cols.remove("date")
+        if jhu_var[:5] == "total":
+            tmp = tmp.sort_values("date")
+            tmp["International"] = tmp["International"].ffill()
+        tmp = (
+            pd.melt(tmp, id_vars="date", value_vars=country_cols)
+            .rename(columns={"value": jhu_var, "variable": "location"})
+            .dropna()
+        )
+        if jhu_var[:7] == "weekly_":
+            tmp[jhu_var] = tmp[jhu_var].div(7).round(3)
+            tmp = tmp.rename(errors="ignore", columns=RENAME_WEEKLY)
+        else:
+            tmp[jhu_var] = tmp[jhu_var].round(3)
+        data_frames.append(tmp)
+    return reduce(lambda left, right: pd.merge(left, right, on=["date", "location"], how="outer"), data_frames)
+
+
+def _profile(func, *args) -> tuple:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {
+        "time (sec)": elapsed,
+        "peak memory (MB)": peak / 2 ** 20,
+        "output (MB)": result.memory_usage(deep=True).sum() / 2 ** 20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--jhu-dir", default=os.path.join(get_project_dir(), "public", "data", "jhu"), help="Path to JHU files."
+    )
+    args = parser.parse_args()
+
+    df_legacy, stats_legacy = _profile(get_jhu_legacy, args.jhu_dir)
+    df, stats = _profile(get_jhu, args.jhu_dir)
+    print(pd.DataFrame([stats_legacy, stats], index=["legacy", "single-pass"]).round(2))
+
+    keys = ["date", "location"]
+    df_legacy = df_legacy.sort_values(keys).reset_index(drop=True)
+    df = df.astype({col: float for col in df.columns.drop(keys)}).astype({"location": object})
+    assert_frame_equal(df_legacy, df)
+    print("Outputs are identical.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark vax steps `process` and `generate` with CSV and columnar intermediate files.
+
+Runs both steps in a temporary project folder, once per intermediate format, and checks that public outputs are
+identical. The time needed to load the intermediate files in step `generate` is also reported. Step `process` is run
+on the public `country_data` files, with metadata built from the public `locations.csv` (no access to the spreadsheet
+is needed).
+
+Usage:
+
+    python benchmarks/vax_intermediate.py [--project-dir PATH] [--formats csv,parquet,feather]
+"""
+import argparse
+import filecmp
+import glob
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from cowidev.utils.utils import get_project_dir
+from cowidev.vax.cmd.generate_dataset import DatasetGenerator, main_generate_dataset
+from cowidev.vax.cmd.process_data import CountryDataProcessor, export_intermediate
+from cowidev.vax.utils.paths import Paths
+
+
+OUTPUTS = [
+    "public/data/vaccinations/vaccinations.csv",
+    "public/data/vaccinations/vaccinations.json",
+    "public/data/vaccinations/locations.csv",
+    "public/data/vaccinations/vaccinations-by-manufacturer.csv",
+    "public/data/vaccinations/vaccinations-by-age-group.csv",
+    "scripts/grapher/COVID-19 - Vaccinations.csv",
+    "scripts/grapher/COVID-19 - Vaccinations by manufacturer.csv",
+    "scripts/grapher/COVID-19 - Vaccinations by age group.csv",
+]
+
+
+def _build_project(project_dir: str, folder: str):
+    for dirname in ["public/data/vaccinations/country_data", "public/data/internal/timestamp", "scripts/grapher"]:
+        os.makedirs(os.path.join(folder, dirname))
+    os.makedirs(os.path.join(folder, "scripts/output/vaccinations"))
+    for dirname in ["scripts/input"] + [
+        f"scripts/output/vaccinations/{d}" for d in ["by_manufacturer", "by_age_group", "metadata"]
+    ]:
+        os.symlink(os.path.join(project_dir, dirname), os.path.join(folder, dirname))
+
+
+def _load_locations(project_dir: str) -> tuple:
+    filepaths = sorted(glob.glob(os.path.join(project_dir, "public/data/vaccinations/country_data/*.csv")))
+    vax = [pd.read_csv(filepath) for filepath in filepaths]
+    df_locations = pd.read_csv(os.path.join(project_dir, "public/data/vaccinations/locations.csv"))
+    df_automated = pd.read_csv(os.path.join(project_dir, "scripts/output/vaccinations/automation_state.csv"))
+    df_metadata = (
+        df_locations[["location", "source_name"]]
+        .merge(df_automated, on="location", how="left")
+        .fillna({"automated": False})
+        .assign(include=True)
+    )
+    vax = [df for df in vax if df.location[0] in set(df_metadata.location)]
+    return vax, df_metadata
+
+
+def run(folder: str, fmt: str, vax: list, df_metadata: pd.DataFrame) -> dict:
+    paths = Paths(folder, intermediate_format=fmt)
+    # Process
+    t0 = time.perf_counter()
+    processor = CountryDataProcessor(paths, skip_complete=[], skip_monotonic={}, skip_anomaly={})
+    results = [processor.run(df) for df in vax]
+    df = pd.concat([r["df"] for r in results if r["success"]]).sort_values(by=["location", "date"])
+    df_metadata = df_metadata[df_metadata.location.isin(df.location)]
+    export_intermediate(paths, df, df_metadata)
+    t_process = time.perf_counter() - t0
+    # Generate
+    t0 = time.perf_counter()
+    main_generate_dataset(paths, full=True)
+    t_generate = time.perf_counter() - t0
+    # Load intermediate files only (as done by step generate)
+    generator = DatasetGenerator.__new__(DatasetGenerator)
+    t0 = time.perf_counter()
+    for path in [paths.tmp_vax_all] + glob.glob(paths.tmp_vax_man) + glob.glob(paths.tmp_vax_age):
+        generator._read_input(path)
+    t_load = time.perf_counter() - t0
+    return {"format": fmt, "process (sec)": t_process, "generate (sec)": t_generate, "load (sec)": t_load}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--project-dir", default=get_project_dir(), help="Path to covid-19-data project.")
+    parser.add_argument("--formats", default="csv,parquet,feather", help="Intermediate formats to compare.")
+    args = parser.parse_args()
+    formats = args.formats.split(",")
+
+    vax, df_metadata = _load_locations(args.project_dir)
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = []
+        for fmt in formats:
+            folder = os.path.join(tmp, fmt)
+            _build_project(args.project_dir, folder)
+            timings.append(run(folder, fmt, vax, df_metadata))
+        df_time = pd.DataFrame(timings).set_index("format").round(3)
+        print(df_time)
+        for fmt in formats[1:]:
+            for output in OUTPUTS:
+                path_ref, path = os.path.join(tmp, formats[0], output), os.path.join(tmp, fmt, output)
+                assert filecmp.cmp(path_ref, path, shallow=False), f"{output} differs ({formats[0]} vs {fmt})"
+    print("Outputs are identical.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark the shared HTTP session (`cowidev.utils.web.session`) against one-off `requests.get` calls.
+
+Responses are replayed by a local stand-in server, which serves every file in `--recordings` (e.g. a folder with
+source files saved from a previous run) adding `--latency` seconds to each request. If no recordings are given,
+synthetic payloads are generated.
+
+Usage:
+
+    python benchmarks/web_fetch.py [--recordings DIR] [--latency 0.2] [--per-host 8]
+"""
+import argparse
+import functools
+import os
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from cowidev.utils.web import session
+
+
+class ReplayHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    latency = 0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _synthetic_recordings(folder: str, n: int = 60, size: int = 500_000):
+    for i in range(n):
+        with open(os.path.join(folder, f"source_{i}.csv"), "w") as f:
+            f.write("date,total_vaccinations\n" + "2021-01-01,1000\n" * (size // 16))
+
+
+def _serve(folder: str, latency: float):
+    handler = functools.partial(ReplayHandler, directory=folder)
+    handler.func.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _timeit(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - t0
+
+
+def fetch_one_off(urls):
+    return {url: requests.get(url).ok for url in urls}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recordings", help="Folder with recorded responses. Defaults to synthetic payloads.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latency added to each response (seconds).")
+    parser.add_argument("--per-host", type=int, default=8, help="Maximum concurrent connections per host.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.recordings
+        if folder is None:
+            folder = tmp
+            _synthetic_recordings(folder)
+        server = _serve(folder, args.latency)
+        host, port = server.server_address
+        urls = [f"http://{host}:{port}/{filename}" for filename in sorted(os.listdir(folder))]
+
+        session.MAX_CONNECTIONS_PER_HOST = args.per_host
+        result_one_off, t_one_off = _timeit(fetch_one_off, urls)
+        result_prefetch, t_prefetch = _timeit(session.prefetch, urls)
+        session.clear_prefetched()
+        server.shutdown()
+
+    print(f"Responses: {len(urls)}, latency: {args.latency} s, connections per host: {args.per_host}")
+    print(f"requests.get (sequential): {t_one_off:.3f} s ({sum(result_one_off.values())} ok)")
+    print(f"session.prefetch:          {t_prefetch:.3f} s ({sum(result_prefetch.values())} ok)")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,7 +30,6 @@ from shared import (
 )
 
 from utils.slack_client import send_warning, send_success
-from utils.db_imports import import_dataset
 
 INPUT_PATH = os.path.join(CURRENT_DIR, "../input/jhu/")
 OUTPUT_PATH = os.path.join(CURRENT_DIR, "../../public/data/jhu/")
@@ -326,6 +325,9 @@ def main(skip_download=False):
 
 
 def update_db():
+    # Imported here: connects to the database on import
+    from utils.db_imports import import_dataset
+
     time_str = datetime.now().astimezone(pytz.timezone("Europe/London")).strftime("%-d %B, %H:%M")
     source_name = f"Johns Hopkins University CSSE COVID-19 Data – Last updated {time_str} (London time)"
     import_dataset(
@@ -2,7 +2,10 @@ import sys
 import pandas as pd
 import numpy as np
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 
 CURRENT_DIR = os.path.dirname(__file__)
 sys.path.append(CURRENT_DIR)
@@ -170,6 +173,82 @@ def inject_total_daily_cols(df, measures):
     return df
 
 
+# ========================
+# Per-location time series
+# ========================
+# Derived metrics are computed with NumPy on frames sorted by (location, date), where the rows of each location are
+# contiguous. Frames are only sorted if needed, so that consecutive steps share the same sort.
+
+
+def sort_by_location(df):
+    """Sort `df` by (location, date), unless it is already sorted.
+
+    Returns:
+        tuple: sorted dataframe and location segment of each row (np.ndarray of ints, increasing).
+    """
+    locations = df["location"].to_numpy()
+    dates = df["date"].to_numpy()
+    same_location = locations[1:] == locations[:-1]
+    if not np.all((locations[1:] > locations[:-1]) | (same_location & (dates[1:] > dates[:-1]))):
+        df = df.sort_values(by=["location", "date"])
+        locations = df["location"].to_numpy()
+        same_location = locations[1:] == locations[:-1]
+    segments = np.concatenate([[0], np.cumsum(~same_location)])[: len(df)]
+    return df, segments
+
+
+def shift_segments(values, segments, periods):
+    """Shift `values` by `periods` rows within each segment, as in groupby + `shift`."""
+    shifted = np.full(len(values), np.nan)
+    if abs(periods) >= len(values):
+        return shifted
+    if periods >= 0:
+        src, dst = slice(0, len(values) - periods), slice(periods, None)
+    else:
+        src, dst = slice(-periods, None), slice(0, len(values) + periods)
+    shifted[dst] = values[src]
+    shifted[dst][segments[dst] != segments[src]] = np.nan
+    return shifted
+
+
+def rolling_segments(values, segments, window, min_periods, center=False, how="mean"):
+    """Rolling mean (or sum) of `values` within each segment, with the same semantics as pandas' `rolling`.
+
+    Args:
+        values (np.ndarray): Values, sorted by segment.
+        segments (np.ndarray): Segment of each value (see `sort_by_location`).
+        window (int): Number of rows in the window.
+        min_periods (int): Minimum number of non-missing values in the window.
+        center (bool, optional): Center the window on each row. Defaults to False.
+        how (str, optional): "mean" or "sum". Defaults to "mean".
+
+    Returns:
+        np.ndarray
+    """
+    values = np.asarray(values, dtype=float)
+    offset = (window - 1) // 2 if center else 0
+    total = np.zeros(len(values))
+    count = np.zeros(len(values))
+    for periods in range(-offset, window - offset):
+        shifted = shift_segments(values, segments, periods)
+        valid = ~np.isnan(shifted)
+        total[valid] += shifted[valid]
+        count += valid
+    if how == "mean":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            total = total / count
+    elif how != "sum":
+        raise ValueError(f"Unknown rolling operation: {how}")
+    return np.where(count >= min_periods, total, np.nan)
+
+
+def pct_change_segments(values, segments, periods):
+    """Percentage change of `values` over `periods` rows within each segment, as in groupby + `pct_change`."""
+    values = np.asarray(values, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return values / shift_segments(values, segments, periods) - 1
+
+
 # ======================
 # 'Days since' variables
 # ======================
@@ -248,37 +327,31 @@ days_since_spec = {
 }
 
 
-def _get_date_of_threshold(df, col, threshold):
-    try:
-        return df["date"][df[col] >= threshold].iloc[0]
-    except:
-        return None
-
-
-def _date_diff(a, b, positive_only=False):
-    if pd.isnull(a) or pd.isnull(b):
-        return None
-    diff = (a - b).days
-    if positive_only and diff < 0:
-        return None
-    return diff
-
-
-def _days_since(df, spec):
-    ref_date = pd.to_datetime(_get_date_of_threshold(df, spec["value_col"], spec["value_threshold"]))
-    return (
-        pd.to_datetime(df["date"]).map(lambda date: _date_diff(date, ref_date, spec["positive_only"])).astype("Int64")
-    )
+def _days_since(values, days, segments, threshold, positive_only=False):
+    # Days since the first date where `values` reach `threshold`, within each segment
+    reached = np.flatnonzero(values >= threshold)
+    reached_segments, first = np.unique(segments[reached], return_index=True)
+    ref_days = np.zeros(segments[-1] + 1 if len(segments) else 0, dtype="int64")
+    has_ref = np.zeros(len(ref_days), dtype=bool)
+    ref_days[reached_segments] = days[reached[first]]
+    has_ref[reached_segments] = True
+    diff = days - ref_days[segments]
+    missing = ~has_ref[segments]
+    if positive_only:
+        missing |= diff < 0
+    return pd.arrays.IntegerArray(diff, missing)
 
 
 def inject_days_since(df):
-    df = df.copy()
+    df, segments = sort_by_location(df.copy())
+    days = pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]").astype("int64")
     for col, spec in days_since_spec.items():
-        df[col] = (
-            df[["date", "location", spec["value_col"]]]
-            .groupby("location")
-            .apply(lambda df_group: _days_since(df_group, spec))
-            .reset_index(level=0, drop=True)
+        df[col] = _days_since(
+            df[spec["value_col"]].to_numpy(dtype=float),
+            days,
+            segments,
+            spec["value_threshold"],
+            spec["positive_only"],
         )
     return df
 
@@ -288,18 +361,13 @@ def inject_days_since(df):
 # ===================
 
 
-def _apply_row_cfr_100(row):
-    if pd.notnull(row["total_cases"]) and row["total_cases"] >= 100:
-        return row["cfr"]
-    return pd.NA
-
-
 def inject_cfr(df):
+    df, segments = sort_by_location(df)
     cfr_series = (df["total_deaths"] / df["total_cases"]) * 100
     df["cfr"] = cfr_series.round(decimals=3)
-    df["cfr_100_cases"] = df.apply(_apply_row_cfr_100, axis=1)
+    df["cfr_100_cases"] = df["cfr"].where(df["total_cases"] >= 100)
 
-    shifted_cases = df.sort_values("date").groupby("location")["new_cases_7_day_avg_right"].shift(9)
+    shifted_cases = shift_segments(df["new_cases_7_day_avg_right"].to_numpy(dtype=float), segments, 9)
     df["cfr_short_term"] = (
         df["new_deaths_7_day_avg_right"]
         .div(shifted_cases)
@@ -311,7 +379,7 @@ def inject_cfr(df):
     df.loc[
         (df.cfr_short_term < 0) | (df.cfr_short_term > 10) | (df.date.astype(str) < "2020-09-01"),
         "cfr_short_term",
-    ] = pd.NA
+    ] = np.nan
 
     return df
 
@@ -373,20 +441,15 @@ rolling_avg_spec = {
 
 
 def inject_rolling_avg(df):
-    df = df.copy().sort_values(by="date")
+    df, segments = sort_by_location(df.copy())
     for col, spec in rolling_avg_spec.items():
-        df[col] = df[spec["col"]].astype("float")
-        df[col] = (
-            df.groupby("location")[col]
-            .rolling(
-                window=spec["window"],
-                min_periods=spec["min_periods"],
-                center=spec["center"],
-            )
-            .mean()
-            .round(decimals=5)
-            .reset_index(level=0, drop=True)
-        )
+        df[col] = rolling_segments(
+            df[spec["col"]].to_numpy(dtype=float),
+            segments,
+            window=spec["window"],
+            min_periods=spec["min_periods"],
+            center=spec["center"],
+        ).round(decimals=5)
     return df
 
 
@@ -395,33 +458,26 @@ def inject_rolling_avg(df):
 # ===========================
 
 
+@lru_cache(maxsize=None)
+def load_testing_locations():
+    """Locations with testing data (read once per run)."""
+    return frozenset(get_testing()["location"])
+
+
 def inject_exemplars(df):
     df = inject_population(df)
+    large_population = df["population"] >= 5e6
 
     # Inject days since 100th case IF population ≥ 5M
-    def mapper_days_since(row):
-        if pd.notnull(row["population"]) and row["population"] >= 5e6:
-            return row["days_since_100_total_cases"]
-        return pd.NA
-
-    df["days_since_100_total_cases_and_5m_pop"] = df.apply(mapper_days_since, axis=1)
+    df["days_since_100_total_cases_and_5m_pop"] = df["days_since_100_total_cases"].where(large_population)
 
     # Inject boolean when all exenplar conditions hold
     # Use int because the Grapher doesn't handle non-ints very well
-    countries_with_testing_data = set(get_testing()["location"])
-
-    def mapper_bool(row):
-        if (
-            pd.notnull(row["days_since_100_total_cases"])
-            and pd.notnull(row["population"])
-            and row["days_since_100_total_cases"] >= 21
-            and row["population"] >= 5e6
-            and row["location"] in countries_with_testing_data
-        ):
-            return 1
-        return 0
-
-    df["5m_pop_and_21_days_since_100_cases_and_testing"] = df.apply(mapper_bool, axis=1)
+    df["5m_pop_and_21_days_since_100_cases_and_testing"] = (
+        (df["days_since_100_total_cases"] >= 21).fillna(False)
+        & large_population
+        & df["location"].isin(load_testing_locations())
+    ).astype(int)
 
     return drop_population(df)
 
@@ -451,22 +507,20 @@ doubling_days_spec = {
 
 
 def pct_change_to_doubling_days(pct_change, periods):
-    if pd.notnull(pct_change) and pct_change != 0:
+    pct_change = np.where(pct_change == 0, np.nan, pct_change)
+    with np.errstate(invalid="ignore", divide="ignore"):
         doubling_days = periods * np.log(2) / np.log(1 + pct_change)
-        return np.round(doubling_days, decimals=2)
-    return pd.NA
+    return np.round(doubling_days, decimals=2)
 
 
 def inject_doubling_days(df):
+    df, segments = sort_by_location(df)
     for col, spec in doubling_days_spec.items():
         value_col = spec["value_col"]
         periods = spec["periods"]
         df.loc[df[value_col] == 0, value_col] = np.nan
-        df[col] = (
-            df.groupby("location", as_index=False)[value_col]
-            .pct_change(periods=periods, fill_method=None)[value_col]
-            .map(lambda pct: pct_change_to_doubling_days(pct, periods))
-        )
+        pct_change = pct_change_segments(df[value_col].to_numpy(dtype=float), segments, periods)
+        df[col] = pct_change_to_doubling_days(pct_change, periods)
     return df
 
 
@@ -481,21 +535,14 @@ def _inject_growth(df, prefix, periods):
     cases_growth_colname = "%s_pct_growth_cases" % prefix
     deaths_growth_colname = "%s_pct_growth_deaths" % prefix
 
-    df[[cases_colname, deaths_colname]] = (
-        df[["location", "new_cases", "new_deaths"]]
-        .fillna(0)
-        .groupby("location")[["new_cases", "new_deaths"]]
-        .rolling(window=periods, min_periods=periods, center=False)
-        .sum()
-        .reset_index(level=0, drop=True)
-    )
-    df[[cases_growth_colname, deaths_growth_colname]] = (
-        df[["location", cases_colname, deaths_colname]]
-        .groupby("location")[[cases_colname, deaths_colname]]
-        .pct_change(periods=periods, fill_method=None)
-        .replace([np.inf, -np.inf], pd.NA)
-        * 100
-    )
+    df, segments = sort_by_location(df)
+    for col, value_col in [(cases_colname, "new_cases"), (deaths_colname, "new_deaths")]:
+        df[col] = rolling_segments(
+            df[value_col].fillna(0).to_numpy(dtype=float), segments, window=periods, min_periods=periods, how="sum"
+        )
+    for growth_col, col in [(cases_growth_colname, cases_colname), (deaths_growth_colname, deaths_colname)]:
+        pct_change = pct_change_segments(df[col].to_numpy(), segments, periods)
+        df[growth_col] = np.where(np.isinf(pct_change), np.nan, pct_change) * 100
 
     return df
 
@@ -605,15 +652,73 @@ def existsin(l1, l2):
     return [x for x in l1 if x in l2]
 
 
-def standard_export(df, output_path, grapher_name):
+def _quote(values):
+    # Quote strings as the `csv` module does by default (only if they contain special characters)
+    values = pd.Series(values, dtype=object)
+    special = values.str.contains('[,"\r\n]', regex=True)
+    values[special] = '"' + values[special].str.replace('"', '""', regex=False) + '"'
+    return values.to_numpy()
+
+
+def _format_column(series):
+    # Same formatting as `DataFrame.to_csv` (shortest repr of floats, missing values as empty strings). Numbers are
+    # formatted once per distinct value (compared bitwise, so that -0.0 is kept apart from 0.0)
+    missing = series.isnull().to_numpy()
+    formatted = np.full(len(series), "", dtype=object)
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy()[~missing]
+        keys = values.view("int%d" % (values.itemsize * 8))
+    elif pd.api.types.is_integer_dtype(series):
+        values = keys = series[~missing].to_numpy(dtype="int64")
+    else:
+        formatted[~missing] = _quote(series[~missing].astype(str))
+        return formatted
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    formatted[~missing] = values[first].astype(str).astype(object)[inverse]
+    return formatted
+
+
+def write_csv(path, columns, chunksize=100000):
+    """Write a CSV file with the same formatting as `DataFrame.to_csv(index=False)`.
+
+    Values are formatted column by column with NumPy, and rows are joined and written in chunks of `chunksize` rows.
+
+    Args:
+        path (str): Path to the file.
+        columns (dict or pd.DataFrame): Columns of the file (header: values).
+        chunksize (int, optional): Number of rows written at once. Defaults to 100000.
+    """
+    header = _quote([str(col) for col in columns.keys()])
+    formatted = [_format_column(pd.Series(values)) for _, values in columns.items()]
+    rows = map(",".join, zip(*formatted))
+    with open(path, "w", newline="") as f:
+        f.write(",".join(header) + os.linesep)
+        for chunk in iter(lambda: list(islice(rows, chunksize)), []):
+            f.write(os.linesep.join(chunk) + os.linesep)
+
+
+def pivot_measures(df, measures):
+    """Pivot all `measures` of `df` at once to wide format (one row per date, one column per location).
+
+    Returns:
+        tuple: values (np.ndarray of shape (measure, date, location)), dates and locations (sorted).
+    """
+    date_codes, dates = pd.factorize(df["date"], sort=True)
+    location_codes, locations = pd.factorize(df["location"], sort=True)
+    if pd.Index(location_codes.astype("int64") * len(dates) + date_codes).has_duplicates:
+        raise ValueError("Index contains duplicate entries, cannot reshape")
+    values = np.full((len(measures), len(dates), len(locations)), np.nan)
+    values[:, date_codes, location_codes] = df[measures].to_numpy(dtype=float).T
+    return values, dates, locations
+
+
+def standard_export(df, output_path, grapher_name, max_workers=None):
+    files = {}
+
     # Grapher
-    df_grapher = df.copy()
-    df_grapher["date"] = pd.to_datetime(df_grapher["date"]).map(lambda date: (date - zero_day).days)
-    df_grapher = (
-        df_grapher[GRAPHER_COL_NAMES.keys()]
-        .rename(columns=GRAPHER_COL_NAMES)
-        .to_csv(os.path.join(output_path, "%s.csv" % grapher_name), index=False)
-    )
+    df_grapher = df[GRAPHER_COL_NAMES.keys()].rename(columns=GRAPHER_COL_NAMES)
+    df_grapher["Year"] = (pd.to_datetime(df["date"]) - zero_day).dt.days
+    files["%s.csv" % grapher_name] = df_grapher
 
     # Table & public extracts for external users
     # Excludes aggregates
@@ -639,14 +744,25 @@ def standard_export(df, output_path, grapher_name):
     df_table = df[~df["location"].isin(excluded_aggregates)]
     # full_data.csv
     full_data_cols = existsin(FULL_DATA_COLS, df_table.columns)
-    df_table[full_data_cols].dropna(subset=BASE_MEASURES, how="all").to_csv(
-        os.path.join(output_path, "full_data.csv"), index=False
-    )
-    # Pivot variables (wide format)
-    for col_name in [*BASE_MEASURES, *PER_MILLION_MEASURES]:
-        df_pivot = df_table.pivot(index="date", columns="location", values=col_name)
-        # move World to first column
-        cols = df_pivot.columns.tolist()
-        cols.insert(0, cols.pop(cols.index("World")))
-        df_pivot[cols].to_csv(os.path.join(output_path, "%s.csv" % col_name))
+    files["full_data.csv"] = df_table[full_data_cols].dropna(subset=BASE_MEASURES, how="all")
+    # Pivot variables (wide format), all at once
+    measures = [*BASE_MEASURES, *PER_MILLION_MEASURES]
+    values, dates, locations = pivot_measures(df_table, measures)
+    # move World to first column
+    cols = list(range(len(locations)))
+    cols.insert(0, cols.pop(locations.get_loc("World")))
+    for i, col_name in enumerate(measures):
+        files["%s.csv" % col_name] = {
+            "date": dates,
+            **{location: values[i, :, col] for location, col in zip(locations[cols], cols)},
+        }
+
+    # Files are written concurrently, in separate processes
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(write_csv, os.path.join(output_path, filename), data)
+            for filename, data in files.items()
+        ]
+        for future in futures:
+            future.result()
     return True
@@ -4,7 +4,11 @@ These are executed in grapherupdate.sh, by calling `cowidev-grapher-db`.
 
 Some grapher updates are run separately, by means of run_grapher_db step in library step.
 """
-import traceback
+import argparse
+import time
+
+import pandas as pd
+from joblib import Parallel, delayed
 
 from cowidev.grapher.db.procs.testing import GrapherTestUpdater
 from cowidev.grapher.db.procs.variants import GrapherVariantsUpdater
@@ -14,7 +18,7 @@ from cowidev.grapher.db.procs.vax import GrapherVaxUpdater
 from cowidev.grapher.db.procs.vax_us import GrapherUSVaxUpdater
 from cowidev.grapher.db.procs.yougov_composite import GrapherYougovCompUpdater
 from cowidev.grapher.db.procs.yougov import GrapherYougovUpdater
-from cowidev.grapher.db.utils.slack_client import send_error
+from cowidev.grapher.db.utils.db import ConnectionPool
 
 
 updaters = [
@@ -30,14 +34,33 @@ updaters = [
 updaters = [u() for u in updaters]
 
 
+def _parse_args():
+    parser = argparse.ArgumentParser(
+        description="Update Grapher datasets in the database.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "-c",
+        "--max-connections",
+        type=int,
+        default=4,
+        help="Number of datasets imported concurrently (size of the database connection pool).",
+    )
+    return parser.parse_args()
+
+
 def main():
-    for updater in updaters:
-        try:
-            updater.run()
-        except Exception as e:
-            tb = traceback.format_exc()
-            send_error(
-                channel="corona-data-updates",
-                title=f"Updating Grapher dataset: {updater.dataset_name}",
-                trace=tb,
-            )
+    args = _parse_args()
+    t0 = time.time()
+    pool = ConnectionPool(max_size=args.max_connections, local_infile=True)
+    try:
+        results = Parallel(n_jobs=args.max_connections, backend="threading")(
+            delayed(updater.run)(pool=pool) for updater in updaters
+        )
+    finally:
+        pool.close()
+    # Errors are reported to Slack by each updater
+    df_time = pd.DataFrame(results).set_index("dataset").rename(columns={"time": "time (sec)"})
+    df_time["rows/sec"] = df_time["rows"].astype(float) / df_time["time (sec)"]
+    print(df_time.round(2).to_string())
+    print(f"Updated {len(updaters)} datasets in {round(time.time() - t0, 2)} seconds")
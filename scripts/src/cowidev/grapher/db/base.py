@@ -1,4 +1,5 @@
 import os
+import time
 import pytz
 from datetime import datetime, timedelta
 import traceback
@@ -54,9 +55,22 @@ class GrapherBaseUpdater:
             .strftime("%-d %B %Y, %H:%M")
         )
 
-    def run(self):
+    def run(self, pool=None):
+        """Import dataset, reporting errors to Slack.
+
+        Args:
+            pool (ConnectionPool, optional): Connection pool shared by concurrent imports. Defaults to None (open a
+                connection).
+
+        Returns:
+            dict: Dataset name, whether the import succeeded, number of data values imported (None if the database was
+                already up to date) and execution time.
+        """
+        t0 = time.time()
+        success = True
+        rows = None
         try:
-            import_dataset(
+            rows = import_dataset(
                 dataset_name=self.dataset_name,
                 namespace=self.namespace,
                 csv_path=self.input_csv_path,
@@ -68,11 +82,14 @@ class GrapherBaseUpdater:
                 slack_notifications=self.slack_notifications,
                 unit=self.unit,
                 unit_short=self.unit_short,
+                pool=pool,
             )
         except Exception as e:
+            success = False
             tb = traceback.format_exc()
             send_error(
                 channel="corona-data-updates",
                 title=f"Updating Grapher dataset: {self.dataset_name}",
                 trace=tb,
             )
+        return {"dataset": self.dataset_name, "success": success, "rows": rows, "time": time.time() - t0}
@@ -1,4 +1,7 @@
 import os
+import threading
+from contextlib import contextmanager
+
 import pymysql
 from dotenv import load_dotenv
 
@@ -7,7 +10,8 @@ load_dotenv()
 
 
 # Connect to the database
-def connection():
+def connection(**kwargs):
+    """Connect to the database. Keyword arguments are passed to `pymysql.connect` (e.g. `local_infile`)."""
     return pymysql.connect(
         db=os.environ.get("DB_NAME"),
         host=os.getenv("DB_HOST"),
@@ -16,4 +20,53 @@ def connection():
         password=os.getenv("DB_PASS"),
         charset="utf8mb4",
         autocommit=False,
+        **kwargs,
     )  # requires .commit(), so everything is implicitly a transaction
+
+
+class ConnectionPool:
+    def __init__(self, max_size: int = 4, **kwargs):
+        """Pool of database connections shared by concurrent imports.
+
+        Connections are opened lazily and reused, and reopened on next use if they were lost. At most `max_size`
+        connections are open at any time; callers block until one is free. Keyword arguments are passed to
+        `connection` (e.g. `local_infile`).
+
+        Args:
+            max_size (int, optional): Maximum number of connections. Defaults to 4.
+        """
+        self.max_size = max_size
+        self.kwargs = kwargs
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, as `with connection() as c`: yields a cursor and commits on exit (rolls back on
+        error)."""
+        self._slots.acquire()
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = connection(**self.kwargs)
+            else:
+                conn.ping(reconnect=True)
+        except Exception:
+            self._slots.release()
+            raise
+        try:
+            with conn as cursor:
+                yield cursor
+        finally:
+            with self._lock:
+                self._idle.append(conn)
+            self._slots.release()
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle = []
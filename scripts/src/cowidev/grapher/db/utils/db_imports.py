@@ -7,7 +7,11 @@ Update vaccination by age data.
 
 import sys
 import os
+import tempfile
+import threading
+import numpy as np
 import pandas as pd
+import pymysql
 
 import json
 from dotenv import load_dotenv
@@ -28,6 +32,12 @@ NAMESPACE = "owid"
 
 DEPLOY_QUEUE_PATH = os.getenv("DEPLOY_QUEUE_PATH")
 
+# Errors raised by the server if LOAD DATA LOCAL INFILE is not allowed
+LOCAL_INFILE_ERRORS = [1148, 3948]
+
+# Serializes writes shared by all datasets (chart versions, deploy queue) between concurrent imports
+SHARED_WRITES_LOCK = threading.Lock()
+
 
 def print_err(*args, **kwargs):
     return print(*args, file=sys.stderr, **kwargs)
@@ -39,6 +49,188 @@ def chunk_df(df, n):
         yield df[i : i + n]
 
 
+def get_data_values(df, entity_id_by_name, variable_id_by_name, id_names=("Country", "Year")):
+    """Get data values of grapher file `df`, in long format.
+
+    Entity and variable names are mapped to their IDs column-wise.
+
+    Returns:
+        pd.DataFrame: Columns value, year, entityId and variableId (one row per non-missing value).
+    """
+    variable_names = [col for col in df.columns if col not in id_names]
+    df = df.melt(
+        id_vars=list(id_names),
+        value_vars=variable_names,
+        var_name="variable",
+        value_name="value",
+    ).dropna(how="any")
+    return pd.DataFrame(
+        {
+            "value": df["value"].to_numpy(),
+            "year": df["Year"].to_numpy().astype(int),
+            "entityId": df["Country"].map(entity_id_by_name).to_numpy(),
+            "variableId": df["variable"].map(variable_id_by_name).to_numpy(),
+        }
+    )
+
+
+def _value_literals(db, values):
+    # SQL literals of values, as escaped by pymysql (floats with 15 significant digits)
+    if pd.api.types.is_float_dtype(values):
+        if np.isinf(values).any():
+            raise ValueError("Infinite values cannot be inserted in data_values")
+        return np.char.mod("%.15g", values.to_numpy())
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype(str).to_numpy()
+    return np.array([db.cursor.connection.escape(value) for value in values.tolist()])
+
+
+def _rows(db, data_values):
+    # Comma-separated literals of each row
+    return (
+        pd.Series(_value_literals(db, data_values["value"]), dtype=object)
+        + ","
+        + data_values["year"].astype(str)
+        + ","
+        + data_values["entityId"].astype(str)
+        + ","
+        + data_values["variableId"].astype(str)
+    )
+
+
+def _insert_multirow(db, data_values, chunksize):
+    rows = ("(" + _rows(db, data_values) + ")").tolist()
+    for i in range(0, len(rows), chunksize):
+        db.execute(
+            "INSERT INTO data_values (value, year, entityId, variableId) VALUES "
+            + ",".join(rows[i : i + chunksize])
+        )
+
+
+def _load_data_infile(db, data_values):
+    # Values are sent as the literals of INSERT statements. Literals with an exponent are double values in an INSERT,
+    # so they are converted to double by the server to be stored the same way; others are stored as written (-0 as 0)
+    rows = _rows(db, data_values).str.replace("^-0,", "0,", regex=True)
+    buffer = "\n".join(rows.tolist()) + "\n"
+    # pymysql reads local files by path: the buffer is spooled to a temporary file
+    with tempfile.NamedTemporaryFile("w", suffix=".csv") as f:
+        f.write(buffer)
+        f.flush()
+        db.execute(
+            """
+            LOAD DATA LOCAL INFILE %s
+            INTO TABLE data_values
+            FIELDS TERMINATED BY ','
+            LINES TERMINATED BY '\\n'
+            (@value, year, entityId, variableId)
+            SET value = IF(LOCATE('e', @value) > 0, @value + 0e0, @value)
+        """,
+            [f.name],
+        )
+
+
+def insert_data_values(db, data_values, bulk_load=True, chunksize=50000):
+    """Insert data values in table data_values.
+
+    Args:
+        db (DBUtils): Database, with a connection created with `local_infile=True` to use LOAD DATA.
+        data_values (pd.DataFrame): Data values (see `get_data_values`).
+        bulk_load (bool, optional): Load numeric values with LOAD DATA LOCAL INFILE or, if it is not allowed, with
+            multi-row INSERT statements of `chunksize` rows. Otherwise, insert rows with `executemany`. Defaults to
+            True.
+        chunksize (int, optional): Number of rows per INSERT statement. Defaults to 50000.
+
+    Returns:
+        str: Method used ("load data", "multi-row insert" or "executemany").
+    """
+    if bulk_load:
+        if pd.api.types.is_numeric_dtype(data_values["value"]):
+            try:
+                _load_data_infile(db, data_values)
+                return "load data"
+            except pymysql.err.MySQLError as e:
+                if e.args[0] not in LOCAL_INFILE_ERRORS:
+                    raise
+                print("LOAD DATA LOCAL INFILE is not allowed, using multi-row INSERTs")
+        _insert_multirow(db, data_values, chunksize)
+        return "multi-row insert"
+    for df_chunk in chunk_df(data_values, chunksize):
+        db.upsert_many(
+            """
+            INSERT INTO
+                data_values (value, year, entityId, variableId)
+            VALUES
+                (%s, %s, %s, %s)
+        """,
+            list(zip(*(df_chunk[col].tolist() for col in df_chunk.columns))),
+        )
+    return "executemany"
+
+
+def get_current_data_values(db, variable_ids):
+    """Get data values of variables `variable_ids` stored in table data_values.
+
+    Returns:
+        pd.DataFrame: Columns variableId, entityId, year and value (as stored).
+    """
+    rows = db.fetch_many(
+        """
+        SELECT variableId, entityId, year, value
+        FROM data_values
+        WHERE variableId IN %s
+    """,
+        [tuple(variable_ids)],
+    )
+    return pd.DataFrame(list(rows), columns=["variableId", "entityId", "year", "value"]).astype(
+        {"variableId": int, "entityId": int, "year": int}
+    )
+
+
+def _same_values(stored, values):
+    # Stored values (VARCHAR) are compared numerically with numeric values, as inserted (floats with 15 significant
+    # digits), and as strings otherwise
+    if pd.api.types.is_float_dtype(values):
+        values = np.char.mod("%.15g", values.to_numpy()).astype(float)
+    elif pd.api.types.is_numeric_dtype(values):
+        values = values.to_numpy().astype(float)
+    else:
+        return stored.to_numpy() == values.astype(str).to_numpy()
+    return pd.to_numeric(stored, errors="coerce").to_numpy(dtype=float) == values
+
+
+def diff_data_values(current, data_values):
+    """Compare new data values with those currently stored.
+
+    Args:
+        current (pd.DataFrame): Stored data values (see `get_current_data_values`).
+        data_values (pd.DataFrame): New data values (see `get_data_values`).
+
+    Returns:
+        tuple: Data values to insert (pd.DataFrame), data values to update (pd.DataFrame) and keys (variableId,
+                entityId, year) of data values to delete (pd.DataFrame).
+    """
+    keys = ["variableId", "entityId", "year"]
+    df = data_values[keys + ["value"]].merge(current, on=keys, how="left", suffixes=("", "_db"), indicator=True)
+    msk_new = (df["_merge"] == "left_only").to_numpy()
+    msk_updated = ~msk_new & ~_same_values(df["value_db"], df["value"])
+    df = current[keys].merge(data_values[keys], on=keys, how="left", indicator=True)
+    to_delete = df.loc[df["_merge"] == "left_only", keys]
+    return data_values[msk_new], data_values[msk_updated], to_delete
+
+
+def delete_data_values(db, keys, chunksize=50000):
+    """Delete data values with keys (variableId, entityId, year) in `keys`, in chunks of `chunksize` rows."""
+    rows = list(zip(keys["variableId"].tolist(), keys["entityId"].tolist(), keys["year"].tolist()))
+    for i in range(0, len(rows), chunksize):
+        db.execute(
+            """
+            DELETE FROM data_values
+            WHERE (variableId, entityId, year) IN %s
+        """,
+            [rows[i : i + chunksize]],
+        )
+
+
 tz_utc = tz_db = timezone.utc
 tz_local = datetime.now(tz_utc).astimezone().tzinfo
 
@@ -52,9 +244,20 @@ def import_dataset(
     slack_notifications=True,
     unit="",
     unit_short=None,
+    bulk_load=True,
+    differential=True,
+    pool=None,
 ):
+    """Import grapher file `csv_path` in dataset `dataset_name`.
+
+    Datasets can be imported concurrently by passing the same connection `pool` (created with `local_infile=True` to
+    use LOAD DATA).
+
+    Returns:
+        int: Number of data values of the dataset, or None if the database was already up to date.
+    """
     print(dataset_name.upper())
-    with connection() as c:
+    with pool.connection() if pool is not None else connection(local_infile=bulk_load) as c:
         db = DBUtils(c)
 
         # Check whether the database is up to date, by checking the
@@ -95,24 +298,15 @@ def import_dataset(
 
         entity_names = list(df["Country"].unique())
 
-        db_entities_query = db.fetch_many(
-            """
-            SELECT id, name
-            FROM entities
-            WHERE name IN %s
-        """,
-            [entity_names],
-        )
+        db_entity_id_by_name = db.get_entities(entity_names)
 
-        db_entity_id_by_name = {name: id for id, name in db_entities_query}
-
-        # Terminate if some entities are missing from the database
+        # Terminate if some entities are missing from the database (raising, so that concurrent imports carry on)
         missing_entity_names = set(entity_names) - set(db_entity_id_by_name.keys())
         if len(missing_entity_names) > 0:
             print_err(
                 f"Entity names missing from database: {str(missing_entity_names)}"
             )
-            sys.exit(1)
+            raise ValueError(f"Entity names missing from database: {str(missing_entity_names)}")
 
         # Fetch the source
 
@@ -180,48 +374,42 @@ def import_dataset(
                     display=default_variable_display,
                 )
 
-        # Delete all data_values in dataset
+        data_values = get_data_values(df, db_entity_id_by_name, db_variable_id_by_name, id_names)
+        num_data_values = len(data_values)
 
-        print("Deleting all data_values...")
+        if differential:
+            # Only apply changes to data_values
 
-        db.execute(
-            """
-            DELETE FROM data_values
-            WHERE variableId IN %s
-        """,
-            [tuple(db_variable_id_by_name.values())],
-        )
+            print("Comparing with current data_values...")
 
-        # Insert new data_values
+            current = get_current_data_values(db, db_variable_id_by_name.values())
+            to_insert, to_update, to_delete = diff_data_values(current, data_values)
+            print(f"Changes: {len(to_insert)} inserts, {len(to_update)} updates, {len(to_delete)} deletes")
+            delete_data_values(db, pd.concat([to_update, to_delete]))
+            data_values = pd.concat([to_insert, to_update])
+            changed_variable_ids = list(
+                set(data_values["variableId"].tolist()) | set(to_delete["variableId"].tolist())
+            )
+        else:
+            # Delete all data_values in dataset
 
-        print("Inserting new data_values...")
-
-        df_data_values = df.melt(
-            id_vars=id_names,
-            value_vars=variable_names,
-            var_name="variable",
-            value_name="value",
-        ).dropna(how="any")
-
-        for df_chunk in chunk_df(df_data_values, 50000):
-            data_values = [
-                (
-                    row["value"],
-                    int(row["Year"]),
-                    db_entity_id_by_name[row["Country"]],
-                    db_variable_id_by_name[row["variable"]],
-                )
-                for _, row in df_chunk.iterrows()
-            ]
-            db.upsert_many(
+            print("Deleting all data_values...")
+
+            db.execute(
                 """
-                INSERT INTO
-                    data_values (value, year, entityId, variableId)
-                VALUES
-                    (%s, %s, %s, %s)
+                DELETE FROM data_values
+                WHERE variableId IN %s
             """,
-                data_values,
+                [tuple(db_variable_id_by_name.values())],
             )
+            changed_variable_ids = list(db_variable_id_by_name.values())
+
+        # Insert new data_values
+
+        if len(data_values):
+            print("Inserting new data_values...")
+            method = insert_data_values(db, data_values, bulk_load=bulk_load)
+            print(f"Inserted {len(data_values)} data_values ({method})")
 
         # Update dataset dataUpdatedAt time & dataUpdatedBy
 
@@ -247,35 +435,40 @@ def import_dataset(
             [source_name, db_source_id],
         )
 
-        # Update chart versions to trigger rebake
-
-        db.execute(
-            """
-            UPDATE charts
-            SET config = JSON_SET(config, "$.version", config->"$.version" + 1)
-            WHERE id IN (
-                SELECT DISTINCT chart_dimensions.chartId
-                FROM chart_dimensions
-                JOIN variables ON variables.id = chart_dimensions.variableId
-                WHERE variables.datasetId = %s
-            )
-        """,
-            [db_dataset_id],
-        )
-
-        # Enqueue deploy
-
-        if DEPLOY_QUEUE_PATH:
-            with open(DEPLOY_QUEUE_PATH, "a") as f:
-                f.write(
-                    json.dumps(
-                        {
-                            "message": f"Automated dataset update: {dataset_name}",
-                            "timeISOString": datetime.now().isoformat(),
-                        }
+        # Charts can show variables of several datasets: their versions are updated and the deploy is enqueued by one
+        # import at a time, committing before releasing the lock so that concurrent imports do not deadlock on charts
+
+        with SHARED_WRITES_LOCK:
+            # Update versions of charts with changed variables to trigger rebake
+
+            if changed_variable_ids:
+                db.execute(
+                    """
+                    UPDATE charts
+                    SET config = JSON_SET(config, "$.version", config->"$.version" + 1)
+                    WHERE id IN (
+                        SELECT DISTINCT chart_dimensions.chartId
+                        FROM chart_dimensions
+                        WHERE chart_dimensions.variableId IN %s
                     )
-                    + "\n"
+                """,
+                    [changed_variable_ids],
                 )
+            c.connection.commit()
+
+            # Enqueue deploy
+
+            if DEPLOY_QUEUE_PATH:
+                with open(DEPLOY_QUEUE_PATH, "a") as f:
+                    f.write(
+                        json.dumps(
+                            {
+                                "message": f"Automated dataset update: {dataset_name}",
+                                "timeISOString": datetime.now().isoformat(),
+                            }
+                        )
+                        + "\n"
+                    )
 
     print("Database update successful.")
 
@@ -284,3 +477,5 @@ def import_dataset(
             channel="corona-data-updates" if not os.getenv("IS_DEV") else "bot-testing",
             title=f"Updated Grapher dataset: {dataset_name}",
         )
+
+    return num_data_values
@@ -2,6 +2,9 @@
 # At some point in the future we should turn it into a package.
 
 import json
+import os
+import tempfile
+import threading
 import time
 from unidecode import unidecode
 
@@ -18,6 +21,69 @@ class NotOne(ValueError):
     pass
 
 
+# File where entity IDs are persisted between runs
+ENTITY_CACHE_PATH = os.getenv(
+    "GRAPHER_ENTITY_CACHE_PATH", os.path.join(tempfile.gettempdir(), "grapher_entity_cache.json")
+)
+
+
+class EntityCache:
+    def __init__(self, path):
+        """Entity IDs by name, shared by all DBUtils of the process and persisted in `path`.
+
+        IDs are kept by exact entity name (`entities.name`) and by normalised name (entity names and country name
+        tool aliases, see `normalize_entity_name`). The cache is only valid for the database and the max id of table
+        entities it was stored with. It is cleared if entities were inserted or deleted since (e.g. inserts rolled back
+        with their transaction).
+        """
+        self.path = path
+        self.key = None
+        self.entity_id_by_name = {}
+        self.entity_id_by_normalised_name = {}
+        # Held by DBUtils from validation through lookups and updates of the cache (reentrant: also held by
+        # `validate` and `save`)
+        self.lock = threading.RLock()
+
+    def validate(self, db):
+        """Clear the cache if it is not valid for the current state of `db`, loading it from disk first."""
+        (host, database, max_id) = db.fetch_one("SELECT @@hostname, DATABASE(), MAX(id) FROM entities")
+        key = [host, database, max_id]
+        with self.lock:
+            if self.key is None:
+                try:
+                    with open(self.path) as f:
+                        data = json.load(f)
+                    self.key, self.entity_id_by_name, self.entity_id_by_normalised_name = (
+                        data["key"],
+                        data["entity_id_by_name"],
+                        data["entity_id_by_normalised_name"],
+                    )
+                except (FileNotFoundError, ValueError, KeyError):
+                    pass
+            if self.key != key:
+                self.key = key
+                self.entity_id_by_name = {}
+                self.entity_id_by_normalised_name = {}
+
+    def save(self, max_id=None):
+        """Persist the cache, after entities up to `max_id` were inserted."""
+        with self.lock:
+            if max_id is not None:
+                self.key = self.key[:2] + [max(self.key[2] or 0, max_id)]
+            path_tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}"
+            data = {
+                "key": self.key,
+                "entity_id_by_name": dict(self.entity_id_by_name),
+                "entity_id_by_normalised_name": dict(self.entity_id_by_normalised_name),
+            }
+            with open(path_tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(path_tmp, self.path)
+
+
+entity_cache = EntityCache(ENTITY_CACHE_PATH)
+
+
 class DBUtils:
 
     # TODO create bulk inserts for every create? what type should they return?
@@ -35,7 +101,14 @@ class DBUtils:
             "sources_inserted": 0,
             "sources_updated": 0,
         }
-        self.entity_id_by_normalised_name = {}
+
+    @property
+    def entity_id_by_name(self):
+        return entity_cache.entity_id_by_name
+
+    @property
+    def entity_id_by_normalised_name(self):
+        return entity_cache.entity_id_by_normalised_name
 
     def get_counts(self):
         return self.counts
@@ -337,37 +410,76 @@ class DBUtils:
             return None
 
     def get_or_create_entity(self, name):
-        # Serve from cache if available
-        entity_id = self.__get_cached_entity_id(name)
-        if entity_id is not None:
-            return entity_id
-        # Populate cache from database
-        self.prefill_entity_cache([name])
-        entity_id = self.__get_cached_entity_id(name)
-        if entity_id is not None:
-            return entity_id
-        # If still not in cache, it's a new entity and we have to insert it
-        else:
-            self.upsert_one(
+        return self.get_or_create_entities([name])[name]
+
+    def get_entities(self, names):
+        """Get IDs of entities `names` found in the database, matching names exactly against `entities.name`.
+
+        Names are served from the entity cache, which is filled with one query for all the names missing from it.
+
+        Returns:
+            dict: Entity IDs by name, for names found.
+        """
+        with entity_cache.lock:
+            entity_cache.validate(self)
+            missing_names = [name for name in names if name not in self.entity_id_by_name]
+            if missing_names:
+                rows = self.fetch_many(
+                    """
+                    SELECT id, name
+                    FROM entities
+                    WHERE name IN %s
+                """,
+                    [missing_names],
+                )
+                self.entity_id_by_name.update({name: id for id, name in rows})
+                entity_cache.save()
+            return {name: self.entity_id_by_name[name] for name in names if name in self.entity_id_by_name}
+
+    def get_or_create_entities(self, names):
+        """Get IDs of entities `names`, by normalised name or country name tool alias, inserting those missing from the
+        database with one multi-row INSERT.
+
+        Returns:
+            dict: Entity IDs by name.
+        """
+        with entity_cache.lock:
+            entity_cache.validate(self)
+            # Populate cache from database
+            uncached_names = [name for name in names if self.__get_cached_entity_id(name) is None]
+            if uncached_names:
+                self.prefill_entity_cache(uncached_names)
+                entity_cache.save()
+            # One new entity per normalised name
+            missing_names = {}
+            for name in names:
+                if self.__get_cached_entity_id(name) is None:
+                    missing_names.setdefault(normalize_entity_name(name), name)
+            if missing_names:
+                missing_names = list(missing_names.values())
+                self.execute(
+                    """
+                    INSERT INTO entities
+                        (name, displayName, validated, createdAt, updatedAt)
+                    VALUES
                 """
-                INSERT INTO entities
-                    (name, displayName, validated, createdAt, updatedAt)
-                VALUES
-                    (%s, '', FALSE, NOW(), NOW())
-            """,
-                [name],
-            )
-            self.counts["entities_inserted"] += 1
-            (entity_id,) = self.fetch_one(
-                """
-                SELECT id FROM entities
-                WHERE name = %s
-            """,
-                [name],
-            )
-            # Cache the newly created entity
-            self.entity_id_by_normalised_name[normalize_entity_name(name)] = entity_id
-            return entity_id
+                    + ",".join(["(%s, '', FALSE, NOW(), NOW())"] * len(missing_names)),
+                    missing_names,
+                )
+                self.counts["entities_inserted"] += len(missing_names)
+                rows = self.fetch_many(
+                    """
+                    SELECT id, name FROM entities
+                    WHERE name IN %s
+                    ORDER BY id ASC
+                """,
+                    [missing_names],
+                )
+                # Cache the newly created entities
+                self.entity_id_by_name.update({name: id for id, name in rows})
+                self.entity_id_by_normalised_name.update({normalize_entity_name(name): id for id, name in rows})
+                entity_cache.save(max_id=max(id for id, _ in rows))
+            return {name: self.__get_cached_entity_id(name) for name in names}
 
     def prefill_entity_cache(self, names):
         rows = self.fetch_many(
@@ -390,13 +502,14 @@ class DBUtils:
         """,
             {"country_names": [normalize_entity_name(x) for x in names]},
         )
-        # Merge the two dicts
-        self.entity_id_by_normalised_name.update(
-            {
-                # entityName → entityId
-                **dict((row[1], row[2]) for row in rows if row[1]),
-                # country_tool_name → entityId
-                # the country tool name should take precedence
-                **dict((row[0], row[2]) for row in rows if row[0]),
-            }
-        )
+        # Merge the two dicts, with keys normalised as names looked up (LOWER keeps accents)
+        with entity_cache.lock:
+            self.entity_id_by_normalised_name.update(
+                {
+                    # entityName → entityId
+                    **dict((normalize_entity_name(row[1]), row[2]) for row in rows if row[1]),
+                    # country_tool_name → entityId
+                    # the country tool name should take precedence
+                    **dict((normalize_entity_name(row[0]), row[2]) for row in rows if row[0]),
+                }
+            )
@@ -1,5 +1,8 @@
+import os
+import tempfile
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
 
@@ -13,7 +16,18 @@ class Grapheriser:
         fillna_0: bool = True,
         pivot_column: str = None,
         pivot_values: str = None,
+        block_size: int = None,
+        chunksize: int = 100000,
     ) -> None:
+        """Generate grapher file.
+
+        Args:
+            block_size (int, optional): If given, the input is processed in blocks of `block_size` locations, in
+                order of location, and the output is written block by block (see `run_streaming`). Defaults to None
+                (process the complete input in memory).
+            chunksize (int, optional): Number of rows read at a time from the input when processing it in blocks.
+                Defaults to 100000.
+        """
         self.location = location
         self.date = date
         self.date_ref = date_ref
@@ -21,6 +35,8 @@ class Grapheriser:
         self.fillna_0 = fillna_0
         self.pivot_column = pivot_column
         self.pivot_values = pivot_values
+        self.block_size = block_size
+        self.chunksize = chunksize
 
     @property
     def columns_metadata(self) -> list:
@@ -65,16 +81,86 @@ class Grapheriser:
             df[columns_data] = df[columns_data].fillna(0)
         return df
 
-    def pipeline(self, input_path: str):
-        df = pd.read_csv(input_path, parse_dates=[self.date])
-        df = (
+    def pipeline_df(self, df: pd.DataFrame) -> pd.DataFrame:
+        return (
             df.pipe(self.pipe_pivot)
             .pipe(self.pipe_metadata_columns)
             .pipe(self.pipe_order_columns)
             .pipe(self.pipe_fillna)
         )
-        return df
+
+    def pipeline(self, input_path: str):
+        df = pd.read_csv(input_path, parse_dates=[self.date])
+        return self.pipeline_df(df)
+
+    def _split_blocks(self, input_path: str, folder: str) -> list:
+        # Read input `chunksize` rows at a time and store the rows of each block of `block_size` locations (rows with
+        # missing location in the last one) in `folder`. Returns paths of the stored pieces of each block
+        locations = pd.read_csv(input_path, usecols=[self.location], dtype=str)[self.location]
+        locations = sorted(locations.dropna().unique())
+        block_by_location = {location: i // self.block_size for i, location in enumerate(locations)}
+        paths = [[] for _ in range(max(len(locations) - 1, 0) // self.block_size + 2)]
+        chunks = pd.read_csv(input_path, parse_dates=[self.date], chunksize=self.chunksize)
+        for n, chunk in enumerate(chunks):
+            blocks = chunk[self.location].map(block_by_location).fillna(len(paths) - 1).astype(int)
+            for i, df in chunk.groupby(blocks):
+                paths[i].append(os.path.join(folder, f"block_{i}_{n}.pkl"))
+                df.to_pickle(paths[i][-1])
+        return [block_paths for block_paths in paths if block_paths]
+
+    def _common_dtype(self, dtypes: list):
+        dtypes = set(dtypes)
+        if len(dtypes) == 1:
+            return dtypes.pop()
+        if all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in dtypes):
+            return np.result_type(*dtypes)
+        return object
+
+    def run_streaming(self, input_path: str, output_path: str):
+        """Generate grapher file processing the input in blocks of `block_size` locations.
+
+        Input rows are first read `chunksize` rows at a time and split by location block into temporary files. Each
+        block then goes through the pipeline and is stored, and blocks are finally written in order of location. Only
+        one chunk or block is held in memory at a time.
+
+        Output is the same as that of `pipeline`: columns missing from a block (pivoted values of no location in the
+        block) are added and filled as in the pipeline, and columns get the dtype they would have when processing the
+        complete input (e.g. float if any block has missing values).
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            paths = []
+            columns = []
+            dtypes = {}
+            for i, block_paths in enumerate(self._split_blocks(input_path, folder)):
+                df = self.pipeline_df(pd.concat([pd.read_pickle(path) for path in block_paths]))
+                paths.append(os.path.join(folder, f"block_{i}.pkl"))
+                df.to_pickle(paths[-1])
+                columns += [col for col in df.columns if col not in columns]
+                for col, dtype in df.dtypes.items():
+                    dtypes.setdefault(col, []).append(dtype)
+            if not paths:
+                return self.pipeline(input_path).to_csv(output_path, index=False)
+            columns_data = [col for col in columns if col not in self.columns_metadata]
+            if self.pivot_column is not None and self.pivot_values is not None:
+                # Pivoted values share their dtype, with missing values in blocks where some were not pivoted
+                columns_data = sorted(columns_data)
+                dtypes_data = sum((dtypes[col] for col in columns_data), [])
+                if any(len(dtypes[col]) < len(paths) for col in columns_data):
+                    dtypes_data.append(np.dtype(float))
+                dtypes.update({col: dtypes_data for col in columns_data})
+            columns = self.columns_metadata + columns_data
+            dtypes = {col: self._common_dtype(dtypes[col]) for col in columns}
+            for i, path in enumerate(paths):
+                df = pd.read_pickle(path)
+                columns_missing = [col for col in columns if col not in df.columns]
+                df = df.reindex(columns=columns)
+                if self.fillna_0:
+                    df[columns_missing] = df[columns_missing].fillna(0)
+                df = df.astype(dtypes)
+                df.to_csv(output_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
 
     def run(self, input_path: str, output_path: str):
+        if self.block_size:
+            return self.run_streaming(input_path, output_path)
         df = self.pipeline(input_path)
         df.to_csv(output_path, index=False)
@@ -5,9 +5,34 @@ Merges all COVID-19 data into a 'megafile';
 - Includes derived variables that can't be easily calculated, such as X per capita;
 - Includes country ISO codes in a column next to country names.
 """
+import argparse
 
-from cowidev.megafile.generate import generate_megafile
+from cowidev.megafile.generate import generate_megafile, generate_latest
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Generate megafile.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only recompute and write outputs for locations that changed since the previous build.",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Check that outputs are identical to those of a full rebuild.",
+    )
+    parser.add_argument(
+        "--latest-only",
+        action="store_true",
+        help="Only update latest files, from the last exported dataset (owid-covid-data.parquet).",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    generate_megafile()
+    args = _parse_args()
+    if args.latest_only:
+        generate_latest()
+    else:
+        generate_megafile(incremental=args.incremental, verify=args.verify)
@@ -0,0 +1,66 @@
+"""Cache of normalized megafile sources, stored as Parquet files."""
+import hashlib
+import inspect
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from cowidev.utils.utils import get_project_dir
+
+
+CACHE_DIR = os.path.abspath(os.path.join(get_project_dir(), "scripts", "output", "megafile", "cache"))
+
+
+def file_hash(*filepaths) -> str:
+    """Get MD5 hash of the contents of files `filepaths`."""
+    h = hashlib.md5()
+    for filepath in filepaths:
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(2 ** 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def cached(name: str, key: str, func, *args, cache_dir: str = CACHE_DIR, **kwargs) -> tuple:
+    """Get `func(*args, **kwargs)` from cache, or compute it and store it in cache.
+
+    The cached result is used if it was stored with the same `key` (e.g. hash of the source files) and the module of
+    `func` has not changed since.
+
+    Args:
+        name (str): Name of the cached result.
+        key (str): Key identifying the inputs of `func`.
+        func (callable): Function returning a DataFrame.
+        cache_dir (str, optional): Cache directory. Defaults to CACHE_DIR.
+
+    Returns:
+        tuple: DataFrame and whether it was found in cache.
+    """
+    key = f"{key}-{file_hash(inspect.getsourcefile(func))}"
+    path_meta = os.path.join(cache_dir, f"{name}.json")
+    path_data = os.path.join(cache_dir, f"{name}.parquet")
+    try:
+        with open(path_meta) as f:
+            if json.load(f)["key"] == key:
+                return read_parquet(path_data), True
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    df = func(*args, **kwargs)
+    os.makedirs(cache_dir, exist_ok=True)
+    df.to_parquet(path_data, index=False)
+    with open(path_meta, "w") as f:
+        json.dump({"key": key}, f)
+    return df, False
+
+
+def read_parquet(path: str, **kwargs) -> pd.DataFrame:
+    """Read Parquet file `path`, with missing values in object columns as NaN (as in `pd.read_csv`).
+
+    Keyword arguments are passed to `pd.read_parquet` (e.g. `filters`, to only load some rows).
+    """
+    df = pd.read_parquet(path, **kwargs)
+    for col in df.select_dtypes(object).columns:
+        df[col] = df[col].where(df[col].notnull(), np.nan)
+    return df
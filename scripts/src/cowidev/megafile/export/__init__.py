@@ -1,5 +1,5 @@
 from cowidev.megafile.export.public import create_latest, create_dataset
-from cowidev.megafile.export.internal import create_internal
+from cowidev.megafile.export.internal import create_internal, add_internal_metrics, get_annotator, export_internal
 from cowidev.megafile.export.readme import generate_readme
 
 
@@ -7,5 +7,8 @@ __all__ = [
     "create_latest",
     "create_dataset",
     "create_internal",
+    "add_internal_metrics",
+    "get_annotator",
+    "export_internal",
     "generate_readme",
 ]
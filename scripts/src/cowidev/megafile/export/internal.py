@@ -1,4 +1,7 @@
 import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 import numpy as np
@@ -177,22 +180,27 @@ internal_files_columns = {
 }
 
 
-def create_internal(df: pd.DataFrame, output_dir: str, annotations_path: str, country_data: str):
-    # Ensure internal/ dir is created
-    os.makedirs(output_dir, exist_ok=True)
+def create_internal(
+    df: pd.DataFrame,
+    output_dir: str,
+    annotations_path: str,
+    country_data: str,
+    streams: list = None,
+    max_workers: int = None,
+):
+    df = add_internal_metrics(df, country_data)
+    annotator = get_annotator(df, annotations_path)
+    return export_internal(df, annotator, output_dir, streams=streams, max_workers=max_workers)
 
-    # These are "key" or "attribute" columns.
-    # These columns are ignored when dropping rows with dropna().
-    non_value_columns = ["iso_code", "continent", "location", "date", "population"]
 
-    # Load annotations
-    annotator = AnnotatorInternal.from_yaml(annotations_path)
+def add_internal_metrics(df: pd.DataFrame, country_data: str) -> pd.DataFrame:
+    """Add metrics only exported in internal files (CFR, partly vaccinated, etc.).
 
+    All metrics are computed within each location, so the result for a location does not depend on other locations.
+    """
     # Copy df
     df = df.copy()
 
-    # Add new annotations for countries having >100% per-capita metric values (runtime, not stored in ANNOTATIONS_PATH)
-    annotator = add_annotations_countries_100_percentage(df, annotator)
     # Insert CFR column to avoid calculating it on the client, and enable
     # splitting up into cases & deaths columns.
     df["cfr"] = (df["total_deaths"] * 100 / df["total_cases"]).round(3)
@@ -207,23 +215,89 @@ def create_internal(df: pd.DataFrame, output_dir: str, annotations_path: str, co
     df.loc[
         (df.cfr_short_term < 0) | (df.cfr_short_term > 10) | (df.date.astype(str) < "2020-09-01"),
         "cfr_short_term",
-    ] = pd.NA
+    ] = np.nan
 
     # Add partly vaccinated
     df = df.pipe(add_partially_vaccinated, country_data)
     # Add total vaccinations without boosters
     df = df.pipe(add_total_vaccinations_no_boosters)
+    return df
+
+
+def get_annotator(df: pd.DataFrame, annotations_path: str) -> AnnotatorInternal:
+    # Load annotations
+    annotator = AnnotatorInternal.from_yaml(annotations_path)
+    # Add new annotations for countries having >100% per-capita metric values (runtime, not stored in ANNOTATIONS_PATH)
+    return add_annotations_countries_100_percentage(df, annotator)
+
+
+def get_internal_stream(df: pd.DataFrame, name: str, annotator: AnnotatorInternal) -> pd.DataFrame:
+    """Get data of internal file `name` (key in `internal_files_columns`) from `df` (see `add_internal_metrics`)."""
+    # These are "key" or "attribute" columns.
+    # These columns are ignored when dropping rows with dropna().
+    non_value_columns = ["iso_code", "continent", "location", "date", "population"]
+
+    config = internal_files_columns[name]
+    value_columns = list(set(config["columns"]) - set(non_value_columns))
+    df_output = df[config["columns"]]
+    if name == "vaccinations-boosters":
+        df_output = df_output.copy().pipe(fillna_boosters_till_valid)
+    df_output = df_output.dropna(subset=value_columns, how=config["dropna"])
+    return annotator.add_annotations(df_output, name)
+
+
+def export_internal(
+    df: pd.DataFrame, annotator: AnnotatorInternal, output_dir: str, streams: list = None, max_workers: int = None
+) -> dict:
+    """Write internal files to `output_dir`, in parallel.
+
+    `df` is stored once as an Arrow file, which workers memory-map (read-only), so that each one only loads the
+    columns of its file and the frame is not copied to each worker.
+
+    Args:
+        df (pd.DataFrame): Data, with internal metrics (see `add_internal_metrics`).
+        annotator (AnnotatorInternal): Annotations.
+        output_dir (str): Output directory.
+        streams (list, optional): Internal files to write (keys in `internal_files_columns`). Defaults to None (all).
+        max_workers (int, optional): Number of worker processes. Defaults to None (number of processors).
+
+    Returns:
+        dict: Time taken to export each file, in seconds.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    streams = list(internal_files_columns) if streams is None else streams
+    # Ensure internal/ dir is created
+    os.makedirs(output_dir, exist_ok=True)
+    columns = list(dict.fromkeys(col for name in streams for col in internal_files_columns[name]["columns"]))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "internal.arrow")
+        table = pa.Table.from_pandas(df[columns], preserve_index=False)
+        feather.write_feather(table, path, compression="uncompressed")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                name: executor.submit(_export_stream, path, name, annotator, internal_file_path(output_dir, name))
+                for name in streams
+            }
+            timings = {name: future.result() for name, future in futures.items()}
+    for name, seconds in timings.items():
+        print(f"Exported {name} in {round(seconds, 2)} seconds")
+    return timings
+
+
+def _export_stream(path: str, name: str, annotator: AnnotatorInternal, output_path: str) -> float:
+    import pyarrow.feather as feather
+
+    t0 = time.time()
+    table = feather.read_table(path, columns=internal_files_columns[name]["columns"], memory_map=True)
+    df_output = get_internal_stream(table.to_pandas(), name, annotator)
+    df_to_columnar_json(df_output, output_path)
+    return time.time() - t0
+
 
-    # Export
-    for name, config in internal_files_columns.items():
-        output_path = os.path.join(output_dir, f"megafile--{name}.json")
-        value_columns = list(set(config["columns"]) - set(non_value_columns))
-        df_output = df[config["columns"]]
-        if name == "vaccinations-boosters":
-            df_output = df_output.copy().pipe(fillna_boosters_till_valid)
-        df_output = df_output.dropna(subset=value_columns, how=config["dropna"])
-        df_output = annotator.add_annotations(df_output, name)
-        df_to_columnar_json(df_output, output_path)
+def internal_file_path(output_dir: str, name: str) -> str:
+    return os.path.join(output_dir, f"megafile--{name}.json")
 
 
 def add_partially_vaccinated(df: pd.DataFrame, country_data: str):
@@ -1,6 +1,9 @@
+import hashlib
+import json
 import os
 from datetime import date, timedelta
 
+import numpy as np
 import pandas as pd
 
 from cowidev.utils.s3 import upload_to_s3, df_to_s3
@@ -10,53 +13,237 @@ from cowidev.utils.utils import get_project_dir, dict_to_compact_json
 DATA_DIR = os.path.abspath(os.path.join(get_project_dir(), "public", "data"))
 
 
-def create_dataset(df, macro_variables):
-    """Export dataset as CSV, XLSX and JSON (complete time series)."""
-    print("Writing to CSV…")
-    filename = os.path.join(DATA_DIR, "owid-covid-data.csv")
-    df.to_csv(filename, index=False)
-    upload_to_s3(filename, "public/owid-covid-data.csv", public=True)
+def create_dataset(df, macro_variables, output_dir: str = DATA_DIR, upload: bool = True, locations: set = None):
+    """Export dataset as CSV, XLSX, JSON and Parquet (complete time series).
+
+    Rows of each location must be contiguous (e.g. dataset sorted by location and date). Parquet has one row group
+    per location. Each location is also exported to its own CSV and JSON files (`countries/{iso_code}.csv|json`),
+    and the byte ranges of each location in all files are listed in an index (see `create_index`), so that clients
+    can read a single location with HTTP range requests.
+
+    Files are written to `output_dir`. XLSX is only exported if `upload` is True (uploaded to S3, with the other
+    files). If `locations` is given, only country files of these locations (or missing ones) are written.
+    """
+    bounds = _location_bounds(df)
 
-    print("Writing to XLSX…")
-    # filename = os.path.join(DATA_DIR, "owid-covid-data.xlsx")
-    # all_covid.to_excel(os.path.join(DATA_DIR, "owid-covid-data.xlsx"), index=False, engine="xlsxwriter")
-    # upload_to_s3(filename, "public/owid-covid-data.xlsx", public=True)
-    df_to_s3(df, "public/owid-covid-data.xlsx", public=True, extension="xlsx")
+    print("Writing to CSV…")
+    filename = os.path.join(output_dir, "owid-covid-data.csv")
+    ranges_csv = df_to_csv(df, filename, bounds)
+    if upload:
+        upload_to_s3(filename, "public/owid-covid-data.csv", public=True)
+        print("Writing to XLSX…")
+        # filename = os.path.join(DATA_DIR, "owid-covid-data.xlsx")
+        # all_covid.to_excel(os.path.join(DATA_DIR, "owid-covid-data.xlsx"), index=False, engine="xlsxwriter")
+        # upload_to_s3(filename, "public/owid-covid-data.xlsx", public=True)
+        df_to_s3(df, "public/owid-covid-data.xlsx", public=True, extension="xlsx")
 
     print("Writing to JSON…")
-    filename = os.path.join(DATA_DIR, "owid-covid-data.json")
-    df_to_json(
+    filename = os.path.join(output_dir, "owid-covid-data.json")
+    ranges_json = df_to_json(
         df,
-        os.path.join(DATA_DIR, "owid-covid-data.json"),
+        filename,
         macro_variables.keys(),
     )
-    upload_to_s3(filename, "public/owid-covid-data.json", public=True)
+    if upload:
+        upload_to_s3(filename, "public/owid-covid-data.json", public=True)
+
+    print("Writing to Parquet…")
+    filename = os.path.join(output_dir, "owid-covid-data.parquet")
+    ranges_parquet = df_to_parquet(df, filename, bounds)
+    if upload:
+        upload_to_s3(filename, "public/owid-covid-data.parquet", public=True)
+
+    print("Writing index and country files…")
+    index = create_index(df, bounds, ranges_csv, ranges_json, ranges_parquet)
+    filename = os.path.join(output_dir, "owid-covid-data-index.json")
+    with open(filename, "w") as file:
+        file.write(dict_to_compact_json(index))
+    if upload:
+        upload_to_s3(filename, "public/owid-covid-data-index.json", public=True)
+    create_country_files(index, output_dir, locations)
+
+
+def _location_bounds(df) -> np.ndarray:
+    """Get positions where each location starts in `df` (and end of `df`)."""
+    locations = df.location.to_numpy()
+    bounds = np.concatenate([[0], np.flatnonzero(locations[1:] != locations[:-1]) + 1, [len(df)]])
+    if len(df) == 0:
+        return bounds[:1]
+    if len(set(locations[bounds[:-1]])) != len(bounds) - 1:
+        raise ValueError("Rows of each location must be contiguous (e.g. dataset sorted by location and date)!")
+    return bounds
+
+
+def _byte_range(offset: int, content: bytes) -> dict:
+    return {"offset": offset, "length": len(content), "md5": hashlib.md5(content).hexdigest()}
+
+
+def create_index(df, bounds, ranges_csv: list, ranges_json: dict, ranges_parquet: list) -> dict:
+    """Build index of locations in the dataset files.
+
+    For each location, the index has its number of rows, date range, byte ranges (with MD5 checksums for CSV and JSON)
+    in the complete CSV, JSON and Parquet files, and paths to its country files. CSV ranges only contain rows (the
+    header is the range `csv.header` of the CSV file). JSON ranges contain the object of the location (value of its ISO
+    code in the complete file). Parquet ranges contain the row group of the location.
+    """
+    index = {
+        "columns": list(df.columns),
+        "csv": {"file": "owid-covid-data.csv", "header": {"offset": 0, "length": len(_csv_header(df))}},
+        "json": {"file": "owid-covid-data.json"},
+        "parquet": {"file": "owid-covid-data.parquet"},
+        "locations": [],
+    }
+    for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        location = df.location.iloc[start]
+        iso_code = df.iso_code.iloc[start]
+        dates = df.date.iloc[start:end]
+        has_iso = pd.notnull(iso_code) and iso_code in ranges_json
+        files = {fmt: f"countries/{iso_code}.{fmt}" for fmt in ["csv", "json"]}
+        index["locations"].append(
+            {
+                "location": location,
+                "iso_code": iso_code if has_iso else None,
+                "rows": int(end - start),
+                "date_min": str(dates.min()),
+                "date_max": str(dates.max()),
+                "csv": ranges_csv[i],
+                "json": ranges_json[iso_code] if has_iso else None,
+                "parquet": ranges_parquet[i],
+                "files": files if has_iso else None,
+            }
+        )
+    return index
+
+
+def create_country_files(index: dict, output_dir: str, locations: set = None):
+    """Write CSV and JSON files of each location listed in `index`, from the complete files.
+
+    If `locations` is given, only files of these locations (or missing ones) are written.
+    """
+    os.makedirs(os.path.join(output_dir, "countries"), exist_ok=True)
+    with open(os.path.join(output_dir, index["csv"]["file"]), "rb") as file_csv, open(
+        os.path.join(output_dir, index["json"]["file"]), "rb"
+    ) as file_json:
+        header = _read_range(file_csv, index["csv"]["header"])
+        for entry in index["locations"]:
+            if entry["files"] is None:
+                continue
+            paths = {fmt: os.path.join(output_dir, path) for fmt, path in entry["files"].items()}
+            exists = all(os.path.isfile(path) for path in paths.values())
+            if locations is not None and entry["location"] not in locations and exists:
+                continue
+            with open(paths["csv"], "wb") as file:
+                file.write(header + _read_range(file_csv, entry["csv"]))
+            with open(paths["json"], "wb") as file:
+                file.write(_read_range(file_json, entry["json"]))
+
+
+def _read_range(file, byte_range: dict) -> bytes:
+    file.seek(byte_range["offset"])
+    return file.read(byte_range["length"])
+
+
+def df_to_csv(df, output_path: str, bounds: np.ndarray) -> list:
+    """Write `df` as CSV (same as `df.to_csv(output_path, index=False)`), one location at a time.
+
+    Returns:
+        list: Byte range of each location (see `_location_bounds`) in the file.
+    """
+    ranges = []
+    with open(output_path, "wb") as file:
+        file.write(_csv_header(df))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            content = df.iloc[start:end].to_csv(index=False, header=False).encode()
+            ranges.append(_byte_range(file.tell(), content))
+            file.write(content)
+    return ranges
+
+
+def _csv_header(df) -> bytes:
+    return df.head(0).to_csv(index=False).encode()
+
+
+def df_to_parquet(df, output_path: str, bounds: np.ndarray) -> list:
+    """Write `df` as Parquet (zstd compression), with one row group per location.
+
+    Returns:
+        list: Row group and byte range of each location (see `_location_bounds`) in the file.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(output_path, table.schema, compression="zstd") as writer:
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            writer.write_table(table.slice(start, end - start))
+    metadata = pq.ParquetFile(output_path).metadata
+    ranges = []
+    for i in range(metadata.num_row_groups):
+        columns = [metadata.row_group(i).column(j) for j in range(metadata.num_columns)]
+        starts = [c.dictionary_page_offset if c.has_dictionary_page else c.data_page_offset for c in columns]
+        end = max(start + c.total_compressed_size for start, c in zip(starts, columns))
+        ranges.append({"row_group": i, "offset": min(starts), "length": end - min(starts)})
+    return ranges
 
 
-def create_latest(df):
-    """Export dataset as CSV, XLSX and JSON (latest data points)."""
-    df = df[df.date >= str(date.today() - timedelta(weeks=2))]
-    df = df.sort_values("date")
+def create_latest(df, output_dir: str = DATA_DIR, upload: bool = True):
+    """Export dataset as CSV, XLSX, Parquet and JSON (latest data points).
 
-    latest = [df[df.location == loc].ffill().tail(1).round(3) for loc in set(df.location)]
-    latest = pd.concat(latest)
-    latest = latest.sort_values("location").rename(columns={"date": "last_updated_date"})
+    Only rows from the last two weeks are used (see `latest_since`), so `df` does not need the complete history.
+    Files are written to `output_dir`/latest. XLSX is only exported if `upload` is True (uploaded to S3, with the
+    other files).
+    """
+    latest = get_latest(df[df.date >= latest_since()]).round(3).rename(columns={"date": "last_updated_date"})
 
     print("Writing latest version…")
+    os.makedirs(os.path.join(output_dir, "latest"), exist_ok=True)
     # CSV
-    latest.to_csv(os.path.join(DATA_DIR, "latest", "owid-covid-latest.csv"), index=False)
-    upload_to_s3(
-        os.path.join(DATA_DIR, "latest", "owid-covid-latest.csv"), "public/latest/owid-covid-latest.csv", public=True
-    )
-    # XLSX
-    df_to_s3(latest, "public/latest/owid-covid-latest.xlsx", public=True, extension="xlsx")
+    filename = os.path.join(output_dir, "latest", "owid-covid-latest.csv")
+    latest.to_csv(filename, index=False)
+    if upload:
+        upload_to_s3(filename, "public/latest/owid-covid-latest.csv", public=True)
+        # XLSX
+        df_to_s3(latest, "public/latest/owid-covid-latest.xlsx", public=True, extension="xlsx")
+    # Parquet
+    filename = os.path.join(output_dir, "latest", "owid-covid-latest.parquet")
+    latest.to_parquet(filename, index=False, compression="zstd")
+    if upload:
+        upload_to_s3(filename, "public/latest/owid-covid-latest.parquet", public=True)
     # JSON
-    latest.dropna(subset=["iso_code"]).set_index("iso_code").to_json(
-        os.path.join(DATA_DIR, "latest", "owid-covid-latest.json"), orient="index"
-    )
-    upload_to_s3(
-        os.path.join(DATA_DIR, "latest", "owid-covid-latest.json"), "public/latest/owid-covid-latest.json", public=True
-    )
+    filename = os.path.join(output_dir, "latest", "owid-covid-latest.json")
+    latest.dropna(subset=["iso_code"]).set_index("iso_code").to_json(filename, orient="index")
+    if upload:
+        upload_to_s3(filename, "public/latest/owid-covid-latest.json", public=True)
+
+
+def latest_since() -> str:
+    """Get first date of the data points used in latest files."""
+    return str(date.today() - timedelta(weeks=2))
+
+
+def get_latest(df) -> pd.DataFrame:
+    """Get last valid value of each column for each location (one row per location, sorted by location).
+
+    Equivalent to forward-filling each location sorted by date and keeping its last row, but computed on all columns
+    and locations at once: rows are sorted by location and date (unless they already are), and the position of the
+    last valid value of each location is found with a single reduction per column.
+    """
+    locations, dates = df.location.to_numpy(), df.date.to_numpy()
+    is_sorted = (locations[1:] > locations[:-1]) | ((locations[1:] == locations[:-1]) & (dates[1:] > dates[:-1]))
+    if not is_sorted.all():
+        df = df.sort_values(["location", "date"])
+        locations = df.location.to_numpy()
+    if len(df) == 0:
+        return df.reset_index(drop=True)
+
+    starts = np.flatnonzero(np.concatenate([[True], locations[1:] != locations[:-1]]))
+    positions = np.arange(len(df))
+    latest = {}
+    for col in df.columns:
+        last = np.maximum.reduceat(np.where(df[col].notnull().to_numpy(), positions, -1), starts)
+        values = df[col].take(np.maximum(last, 0)).reset_index(drop=True)
+        latest[col] = values.where(last >= 0) if (last < 0).any() else values
+    return pd.DataFrame(latest)
 
 
 def df_to_json(complete_dataset, output_path, static_columns):
@@ -64,21 +251,57 @@ def df_to_json(complete_dataset, output_path, static_columns):
     Writes a JSON version of the complete dataset, with the ISO code at the root.
     NA values are dropped from the output.
     Macro variables are normalized by appearing only once, at the root of each ISO code.
-    """
-    megajson = {}
+    Countries are written one at a time, in a single pass over the dataset grouped by ISO code, so that only one
+    country is held in memory.
 
+    Returns:
+        dict: Byte range of the object of each ISO code in the file.
+    """
     static_columns = ["continent", "location"] + list(static_columns)
 
     complete_dataset = complete_dataset.dropna(axis="rows", subset=["iso_code"])
+    data_columns = complete_dataset.columns.drop(["iso_code"] + static_columns)
+
+    # Group rows by ISO code (in order of appearance), keeping their order within each country
+    codes, isos = pd.factorize(complete_dataset.iso_code)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(isos) + 1))
+    if (order != np.arange(len(order))).any():
+        complete_dataset = complete_dataset.take(order)
+    static_data = complete_dataset[static_columns].iloc[bounds[:-1]].to_dict("records")
+    data_values = [(f"{json.dumps(col)}:", complete_dataset[col].to_numpy()) for col in data_columns]
+
+    ranges = {}
+    with open(output_path, "wb") as file:
+        file.write(b"{")
+        for i, iso in enumerate(isos):
+            file.write(f"{',' if i else ''}{json.dumps(iso)}:".encode())
+            # Static columns, followed by time series in "data"
+            static = dict_to_compact_json({k: v for k, v in static_data[i].items() if pd.notnull(v)})
+            columns = [_encode_json_values(key, values[bounds[i] : bounds[i + 1]]) for key, values in data_values]
+            content = (
+                f"{static[:-1]}{',' if static != '{}' else ''}\"data\":["
+                + ",".join("{" + ",".join(filter(None, row)) + "}" for row in zip(*columns))
+                + "]}"
+            ).encode()
+            ranges[iso] = _byte_range(file.tell(), content)
+            file.write(content)
+        file.write(b"}")
+    return ranges
+
 
-    for iso in complete_dataset.iso_code.unique():
-        country_df = complete_dataset[complete_dataset.iso_code == iso].drop(columns=["iso_code"])
-        static_data = country_df.head(1)[static_columns].to_dict("records")[0]
-        megajson[iso] = {k: v for k, v in static_data.items() if pd.notnull(v)}
-        megajson[iso]["data"] = [
-            {k: v for k, v in r.items() if pd.notnull(v)}
-            for r in country_df.drop(columns=static_columns).to_dict("records")
-        ]
-
-    with open(output_path, "w") as file:
-        file.write(dict_to_compact_json(megajson))
+def _encode_json_values(key: str, values: np.ndarray) -> list:
+    """Encode `values` as JSON members `key:value`. Missing values are encoded as None."""
+    kind = values.dtype.kind
+    if kind == "b":
+        return [key + json.dumps(v) for v in values.tolist()]
+    if kind in "iu":
+        return [key + repr(v) for v in values.tolist()]
+    if kind == "f":
+        if np.isinf(values).any():
+            raise ValueError("Out of range float values are not JSON compliant")
+        return [None if v != v else key + repr(v) for v in values.tolist()]
+    return [
+        None if msk else key + dict_to_compact_json(v.item() if isinstance(v, np.generic) else v)
+        for v, msk in zip(values, pd.isnull(values).tolist())
+    ]
@@ -1,4 +1,6 @@
+import filecmp
 import os
+import tempfile
 from datetime import date
 
 import pandas as pd
@@ -7,10 +9,17 @@ from cowidev.utils.utils import get_project_dir, export_timestamp
 from cowidev.megafile.steps import get_base_dataset, add_macro_variables, add_excess_mortality
 from cowidev.megafile.export import (
     create_internal,
+    add_internal_metrics,
+    get_annotator,
+    export_internal,
     create_dataset,
     create_latest,
     generate_readme,
 )
+from cowidev.megafile.export.internal import internal_files_columns, internal_file_path
+from cowidev.megafile.export.public import latest_since
+from cowidev.megafile.cache import read_parquet
+from cowidev.megafile.incremental import IncrementalBuild
 
 
 INPUT_DIR = os.path.abspath(os.path.join(get_project_dir(), "scripts", "input"))
@@ -19,10 +28,20 @@ DATA_VAX_COUNTRIES_DIR = os.path.abspath(os.path.join(DATA_DIR, "vaccinations",
 ANNOTATIONS_PATH = os.path.abspath(os.path.join(get_project_dir(), "scripts", "scripts", "annotations_internal.yaml"))
 README_TMP = os.path.join(get_project_dir(), "scripts", "scripts", "README.md.template")
 README_FILE = os.path.join(DATA_DIR, "README.md")
+INTERNAL_DIR = os.path.join(DATA_DIR, "internal")
+# Columns not included in final dataset
+COLUMNS_DROP = ["excess_mortality_count_week", "excess_mortality_count_week_pm"]
 
 
-def generate_megafile():
-    """Generate megafile data."""
+def generate_megafile(incremental: bool = False, verify: bool = False):
+    """Generate megafile data.
+
+    Args:
+        incremental (bool, optional): Only recompute internal files for locations that changed since the previous
+                                        build, and only write files that changed (see `cowidev.megafile.incremental`).
+                                        Defaults to False.
+        verify (bool, optional): Check that outputs are identical to those of a full rebuild. Defaults to False.
+    """
     all_covid = get_base_dataset()
 
     # Remove today's datapoint
@@ -87,24 +106,43 @@ def generate_megafile():
     # Check that we only have 1 unique row for each location/date pair
     assert all_covid.drop_duplicates(subset=["location", "date"]).shape == all_covid.shape
 
+    # Locations to update (all, unless incremental build)
+    build = IncrementalBuild(ANNOTATIONS_PATH, DATA_VAX_COUNTRIES_DIR)
+    if incremental:
+        locations = build.changed_locations(all_covid)
+        print(f"Incremental build: {len(locations)} locations changed since previous build")
+
     print("Creating internal files…")
-    create_internal(
-        df=all_covid,
-        output_dir=os.path.join(DATA_DIR, "internal"),
-        annotations_path=ANNOTATIONS_PATH,
-        country_data=DATA_VAX_COUNTRIES_DIR,
-    )
+    if incremental:
+        internal = add_internal_metrics(all_covid[all_covid.location.isin(locations)], DATA_VAX_COUNTRIES_DIR)
+        internal, internal_changed = build.update_internal(internal, locations)
+        print(f"Internal files changed: {internal_changed}")
+    else:
+        internal = add_internal_metrics(all_covid, DATA_VAX_COUNTRIES_DIR)
+        internal_changed = None
+    if internal_changed != []:
+        annotator = get_annotator(internal, ANNOTATIONS_PATH)
+        export_internal(internal, annotator, output_dir=INTERNAL_DIR, streams=internal_changed)
+    facts = all_covid
 
     # Drop columns not included in final dataset
-    cols_drop = ["excess_mortality_count_week", "excess_mortality_count_week_pm"]
-    all_covid = all_covid.drop(columns=cols_drop)
+    all_covid = all_covid.drop(columns=COLUMNS_DROP)
 
     # # Create light versions of complete dataset with only the latest data point
-    print("Writing latest…")
-    create_latest(all_covid)
+    if not incremental or locations or not build.same_day:
+        print("Writing latest…")
+        create_latest(all_covid)
 
     # Create datasets
-    create_dataset(all_covid, macro_variables)
+    if not incremental or locations:
+        create_dataset(all_covid, macro_variables, locations=locations if incremental else None)
+    else:
+        print("No changes since previous build, complete dataset not written")
+
+    # Store build (base of next incremental build)
+    build.save(facts, internal)
+    if verify:
+        verify_build(facts, macro_variables)
 
     # Store the last updated time
     export_timestamp("owid-covid-data-last-updated-timestamp.txt")  # @deprecate
@@ -116,3 +154,47 @@ def generate_megafile():
     export_timestamp("owid-covid-data-last-updated-timestamp-root.txt")
 
     print("All done!")
+
+
+def generate_latest():
+    """Update latest files from the last exported Parquet dataset (only rows of the last two weeks are loaded)."""
+    print("Writing latest…")
+    df = read_parquet(os.path.join(DATA_DIR, "owid-covid-data.parquet"), filters=[("date", ">=", latest_since())])
+    create_latest(df)
+
+
+def verify_build(df, macro_variables):
+    """Check that megafile outputs are identical to those of a full rebuild from fact table `df`."""
+    print("Verifying build…")
+    with tempfile.TemporaryDirectory() as tmp:
+        create_internal(
+            df=df,
+            output_dir=os.path.join(tmp, "internal"),
+            annotations_path=ANNOTATIONS_PATH,
+            country_data=DATA_VAX_COUNTRIES_DIR,
+        )
+        df = df.drop(columns=COLUMNS_DROP)
+        create_latest(df, output_dir=tmp, upload=False)
+        create_dataset(df, macro_variables, output_dir=tmp, upload=False)
+        filenames = [
+            os.path.relpath(internal_file_path(INTERNAL_DIR, name), DATA_DIR) for name in internal_files_columns
+        ] + [
+            os.path.join("latest", "owid-covid-latest.csv"),
+            os.path.join("latest", "owid-covid-latest.json"),
+            os.path.join("latest", "owid-covid-latest.parquet"),
+            "owid-covid-data.csv",
+            "owid-covid-data.json",
+            "owid-covid-data.parquet",
+            "owid-covid-data-index.json",
+        ]
+        filenames += [
+            os.path.join("countries", filename) for filename in sorted(os.listdir(os.path.join(tmp, "countries")))
+        ]
+        differ = [
+            filename
+            for filename in filenames
+            if not filecmp.cmp(os.path.join(tmp, filename), os.path.join(DATA_DIR, filename), shallow=False)
+        ]
+    if differ:
+        raise ValueError(f"Outputs differ from those of a full rebuild: {differ}")
+    print("Outputs are identical to those of a full rebuild.")
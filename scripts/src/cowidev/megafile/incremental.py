@@ -0,0 +1,114 @@
+"""Incremental builds of the megafile.
+
+Each build stores its fact table (complete dataset, one row per location and date) and the internal data (fact table
+with internal metrics) in `BUILD_DIR`, as Parquet files. An incremental build compares its fact table with the stored
+one and only recomputes internal metrics for locations with rows added, removed or modified. Derived metrics (e.g.
+short-term CFR, boosters filled until their first valid value) are computed within each location, so recomputing the
+complete series of a changed location also covers the trailing windows of these metrics. Internal files are only
+written if any of their columns changed, and public files if any location changed.
+"""
+import inspect
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from cowidev.utils.utils import get_project_dir
+from cowidev.megafile.cache import file_hash, read_parquet
+from cowidev.megafile.export import internal
+
+
+BUILD_DIR = os.path.abspath(os.path.join(get_project_dir(), "scripts", "output", "megafile", "build"))
+
+
+def changed_locations(df: pd.DataFrame, df_prev: pd.DataFrame) -> set:
+    """Get locations with rows added, removed or modified in `df` with respect to `df_prev`."""
+    if list(df.columns) != list(df_prev.columns):
+        return set(df.location) | set(df_prev.location)
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    hashes_prev = pd.util.hash_pandas_object(df_prev, index=False).to_numpy()
+    return set(df.location[~np.isin(hashes, hashes_prev)]) | set(df_prev.location[~np.isin(hashes_prev, hashes)])
+
+
+class IncrementalBuild:
+    def __init__(self, annotations_path: str, country_data: str, folder: str = BUILD_DIR):
+        """Previous build of the megafile.
+
+        The previous build is discarded if the inputs of the internal files other than the fact table (annotations,
+        country files with partly vaccinated data) or their code changed since.
+
+        Args:
+            annotations_path (str): Path to internal annotations.
+            country_data (str): Path to vaccination country files.
+            folder (str, optional): Directory of the build. Defaults to BUILD_DIR.
+        """
+        self.folder = folder
+        self.key = file_hash(
+            annotations_path,
+            inspect.getsourcefile(internal),
+            *internal.country_vax_data_partly(country_data),
+        )
+        try:
+            with open(self._path_meta) as f:
+                self.meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.meta = {}
+
+    @property
+    def _path_meta(self):
+        return os.path.join(self.folder, "build.json")
+
+    def _path(self, name: str):
+        return os.path.join(self.folder, f"{name}.parquet")
+
+    @property
+    def exists(self) -> bool:
+        paths = [self._path("facts"), self._path("internal")]
+        return self.meta.get("key") == self.key and all(os.path.isfile(path) for path in paths)
+
+    @property
+    def same_day(self) -> bool:
+        """True if the previous build was generated today (outputs relative to current date are still valid)."""
+        return self.meta.get("date") == str(date.today())
+
+    def changed_locations(self, df: pd.DataFrame) -> set:
+        """Get locations of fact table `df` that changed since the previous build (all if there is none)."""
+        if not self.exists:
+            return set(df.location)
+        return changed_locations(df, read_parquet(self._path("facts"))) | set(
+            internal.COUNTRIES_WITH_PARTLY_VAX_METRIC
+        )
+
+    def update_internal(self, df: pd.DataFrame, locations: set) -> tuple:
+        """Combine internal data computed for `locations` with that of the previous build for other locations.
+
+        Args:
+            df (pd.DataFrame): Data for `locations`, with internal metrics (see `add_internal_metrics`).
+            locations (set): Recomputed locations.
+
+        Returns:
+            tuple: Complete internal data (pd.DataFrame) and names of internal files with changes in their columns
+                    (list).
+        """
+        if not self.exists:
+            return df, list(internal.internal_files_columns)
+        df_prev = read_parquet(self._path("internal"))
+        msk = df_prev.location.isin(locations)
+        streams = [
+            name
+            for name, config in internal.internal_files_columns.items()
+            if changed_locations(df[config["columns"]], df_prev.loc[msk, config["columns"]])
+        ]
+        df = pd.concat([df_prev[~msk], df]).sort_values(["location", "date"])
+        return df, streams
+
+    def save(self, df: pd.DataFrame, df_internal: pd.DataFrame):
+        """Store fact table `df` and internal data `df_internal` as the latest build."""
+        os.makedirs(self.folder, exist_ok=True)
+        df.to_parquet(self._path("facts"), index=False)
+        df_internal.to_parquet(self._path("internal"), index=False)
+        self.meta = {"key": self.key, "date": str(date.today())}
+        with open(self._path_meta, "w") as f:
+            json.dump(self.meta, f)
@@ -1,52 +1,132 @@
+import hashlib
+import io
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+import pandas as pd
 
 from cowidev.utils.utils import get_project_dir
+from cowidev.utils.web import fetch
+from cowidev.utils.web.cache import HttpCache
+from cowidev.megafile.cache import CACHE_DIR, cached, file_hash
 from cowidev.megafile.steps.cgrt import get_cgrt
 from cowidev.megafile.steps.hosp import get_hosp
-from cowidev.megafile.steps.jhu import get_jhu
+from cowidev.megafile.steps.jhu import get_jhu, JHU_VARIABLES
 from cowidev.megafile.steps.reprod import get_reprod
-from cowidev.megafile.steps.test import get_testing
+from cowidev.megafile.steps.test import get_testing, data_file as testing_file, data_file_second as testing_file_second
 from cowidev.megafile.steps.vax import get_vax
 
 
 INPUT_DIR = os.path.abspath(os.path.join(get_project_dir(), "scripts", "input"))
 GRAPHER_DIR = os.path.abspath(os.path.join(get_project_dir(), "scripts", "grapher"))
 DATA_DIR = os.path.abspath(os.path.join(get_project_dir(), "public", "data"))
+JHU_DIR = os.path.join(DATA_DIR, "jhu")
+REPROD_URL = "https://github.com/crondonm/TrackingR/raw/main/Estimates-Database/database.csv"
+REPROD_MAPPING = os.path.join(INPUT_DIR, "reproduction", "reprod_country_standardized.csv")
+HOSP_FILE = os.path.join(GRAPHER_DIR, "COVID-2019 - Hospital & ICU.csv")
+VAX_FILE = os.path.join(DATA_DIR, "vaccinations", "vaccinations.csv")
+CGRT_FILE = os.path.join(INPUT_DIR, "bsg", "latest.csv")
+CGRT_MAPPING = os.path.join(INPUT_DIR, "bsg", "bsg_country_standardised.csv")
 
 
-def get_base_dataset():
-    """Get owid datasets from: jhu, reproduction rate, hospitalizations, testing ,vaccinations, CGRT."""
-    print("Fetching JHU dataset…")
-    jhu = get_jhu(jhu_dir=os.path.join(get_project_dir(), "public", "data", "jhu"))
-
-    print("Fetching reproduction rate…")
-    reprod = get_reprod(
-        file_url="https://github.com/crondonm/TrackingR/raw/main/Estimates-Database/database.csv",
-        country_mapping=os.path.join(INPUT_DIR, "reproduction", "reprod_country_standardized.csv"),
-    )
+def _load_jhu():
+    filepaths = [os.path.join(JHU_DIR, f"{jhu_var}.csv") for jhu_var in JHU_VARIABLES]
+    jhu, is_cached = cached("jhu", file_hash(*filepaths), get_jhu, jhu_dir=JHU_DIR)
+    # Metrics derived from JHU data (e.g. CFR) are computed in double precision
+    return jhu.astype({col: "float64" for col in jhu.select_dtypes("float32").columns}), is_cached
+
+
+def _load_reprod():
+    # Conditional request: the file is only downloaded if it changed (ETag)
+    http_cache = HttpCache(os.path.join(CACHE_DIR, "http"))
+    response = http_cache.fetch(lambda headers: fetch(REPROD_URL, headers=headers), REPROD_URL)
+    response.raise_for_status()
+    etag = response.headers.get("ETag", response.headers.get("Last-Modified"))
+    key = f"{etag or hashlib.md5(response.content).hexdigest()}-{file_hash(REPROD_MAPPING)}"
+    return cached("reprod", key, get_reprod, file_url=io.BytesIO(response.content), country_mapping=REPROD_MAPPING)
+
 
-    print("Fetching hospital dataset…")
-    hosp = get_hosp(data_file=os.path.join(GRAPHER_DIR, "COVID-2019 - Hospital & ICU.csv"))
+def _load_hosp():
+    return cached("hosp", file_hash(HOSP_FILE), get_hosp, data_file=HOSP_FILE)
 
-    print("Fetching testing dataset…")
-    testing = get_testing()
 
-    print("Fetching vaccination dataset…")
-    vax = get_vax(data_file=os.path.join(DATA_DIR, "vaccinations", "vaccinations.csv"))
+def _load_testing():
+    # Result depends on today's date (observations for current day are removed)
+    key = f"{file_hash(testing_file, testing_file_second)}-{date.today()}"
+    return cached("testing", key, get_testing)
+
+
+def _load_vax():
+    vax, is_cached = cached("vax", file_hash(VAX_FILE), get_vax, data_file=VAX_FILE)
     vax = vax[-vax.location.isin(["England", "Northern Ireland", "Scotland", "Wales"])]
+    return vax, is_cached
+
 
-    print("Fetching OxCGRT dataset…")
-    cgrt = get_cgrt(
-        bsg_latest=os.path.join(INPUT_DIR, "bsg", "latest.csv"),
-        country_mapping=os.path.join(INPUT_DIR, "bsg", "bsg_country_standardised.csv"),
+def _load_cgrt():
+    return cached(
+        "cgrt", file_hash(CGRT_FILE, CGRT_MAPPING), get_cgrt, bsg_latest=CGRT_FILE, country_mapping=CGRT_MAPPING
     )
 
-    # Big merge
-    return (
-        jhu.merge(reprod, on=["date", "location"], how="outer")
-        .merge(hosp, on=["date", "location"], how="outer")
-        .merge(testing, on=["date", "location"], how="outer")
-        .merge(vax, on=["date", "location"], how="outer")
-        .merge(cgrt, on=["date", "location"], how="left")
-        .sort_values(["location", "date"])
+
+SOURCES = {
+    "JHU": _load_jhu,
+    "reproduction rate": _load_reprod,
+    "hospital": _load_hosp,
+    "testing": _load_testing,
+    "vaccination": _load_vax,
+    "OxCGRT": _load_cgrt,
+}
+
+
+def _load_source(name: str, loader):
+    t0 = time.time()
+    df, is_cached = loader()
+    print(f"Fetched {name} dataset in {round(time.time() - t0, 2)} seconds{' (cached)' if is_cached else ''}")
+    return df
+
+
+def join_sources(jhu, reprod, hosp, testing, vax, cgrt):
+    """Join all sources on (location, date).
+
+    Rows are the union of all sources except CGRT, which is only added to existing rows. Each pair (location, date)
+    is encoded as a single integer, so that all sources are aligned at once on a flat index.
+    """
+    keys = ["location", "date"]
+    dfs = {"jhu": jhu, "reprod": reprod, "hosp": hosp, "testing": testing, "vax": vax, "cgrt": cgrt}
+    location_codes, locations = pd.factorize(pd.concat([df.location for df in dfs.values()], ignore_index=True))
+    date_codes, dates = pd.factorize(pd.concat([df.date for df in dfs.values()], ignore_index=True))
+    codes = location_codes.astype("int64") * len(dates) + date_codes
+    bounds = np.cumsum([0] + [len(df) for df in dfs.values()])
+    for i, (name, df) in enumerate(dfs.items()):
+        index = pd.Index(codes[bounds[i] : bounds[i + 1]])
+        if not index.is_unique:
+            raise ValueError(f"Multiple rows for the same location and date in {name} dataset")
+        dfs[name] = df.drop(columns=keys).set_axis(index, axis=0)
+    df = pd.concat([dfs[name] for name in ["jhu", "reprod", "hosp", "testing", "vax"]], axis=1, join="outer").join(
+        dfs["cgrt"], how="left"
     )
+    df.insert(0, "location", locations.take(df.index // len(dates)))
+    df.insert(0, "date", dates.take(df.index % len(dates)))
+    df = df[[col for col in jhu.columns if col in keys] + list(df.columns.drop(keys))]
+    return df.reset_index(drop=True).sort_values(keys)
+
+
+def get_base_dataset():
+    """Get owid datasets from: jhu, reproduction rate, hospitalizations, testing ,vaccinations, CGRT.
+
+    Sources are loaded concurrently. Each source is cached (see `cowidev.megafile.cache`) and is only loaded again
+    if its input files changed.
+    """
+    print("Fetching datasets…")
+    with ThreadPoolExecutor(max_workers=len(SOURCES)) as executor:
+        futures = {name: executor.submit(_load_source, name, loader) for name, loader in SOURCES.items()}
+        jhu, reprod, hosp, testing, vax, cgrt = [future.result() for future in futures.values()]
+
+    # Big merge
+    t0 = time.time()
+    df = join_sources(jhu, reprod, hosp, testing, vax, cgrt)
+    print(f"Joined datasets in {round(time.time() - t0, 2)} seconds")
+    return df
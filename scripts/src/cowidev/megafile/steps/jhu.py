@@ -1,72 +1,89 @@
 "merge"
 import os
-from functools import reduce
+
+import numpy as np
 import pandas as pd
 
 
+JHU_VARIABLES = [
+    "total_cases",
+    "new_cases",
+    "weekly_cases",
+    "total_deaths",
+    "new_deaths",
+    "weekly_deaths",
+    "total_cases_per_million",
+    "new_cases_per_million",
+    "weekly_cases_per_million",
+    "total_deaths_per_million",
+    "new_deaths_per_million",
+    "weekly_deaths_per_million",
+]
+RENAME_WEEKLY = {
+    "weekly_cases": "new_cases_smoothed",
+    "weekly_deaths": "new_deaths_smoothed",
+    "weekly_cases_per_million": "new_cases_smoothed_per_million",
+    "weekly_deaths_per_million": "new_deaths_smoothed_per_million",
+}
+
+
+def _read_jhu_variable(jhu_dir: str, jhu_var: str) -> pd.DataFrame:
+    tmp = pd.read_csv(os.path.join(jhu_dir, f"{jhu_var}.csv"), index_col="date")
+
+    # Carrying last observation forward for International totals to avoid discrepancies
+    if jhu_var[:5] == "total":
+        tmp = tmp.sort_index()
+        tmp["International"] = tmp["International"].ffill()
+
+    if jhu_var[:7] == "weekly_":
+        return tmp.div(7).round(3)
+    return tmp.round(3)
+
+
+def _compact(values: np.ndarray) -> np.ndarray:
+    # Use float32 only if no value is altered
+    values_32 = values.astype(np.float32)
+    if np.array_equal(values_32.astype(np.float64), values, equal_nan=True):
+        return values_32
+    return values
+
+
 def get_jhu(jhu_dir: str):
     """
     Reads each COVID-19 JHU dataset located in /public/data/jhu/
-    Melts the dataframe to vertical format (1 row per country and date)
-    Merges all JHU dataframes into one with outer joins
+    Aligns all datasets on the same dates and locations and stacks them to vertical format (1 row per country and
+    date), in a single pass. Rows with no data for any variable are dropped.
+
+    Locations are stored as categorical and metrics as float32 whenever it does not alter their values.
 
     Returns:
         jhu {dataframe}
     """
+    wide = {jhu_var: _read_jhu_variable(jhu_dir, jhu_var) for jhu_var in JHU_VARIABLES}
 
-    jhu_variables = [
-        "total_cases",
-        "new_cases",
-        "weekly_cases",
-        "total_deaths",
-        "new_deaths",
-        "weekly_deaths",
-        "total_cases_per_million",
-        "new_cases_per_million",
-        "weekly_cases_per_million",
-        "total_deaths_per_million",
-        "new_deaths_per_million",
-        "weekly_deaths_per_million",
-    ]
-
-    data_frames = []
-
-    # Process each file and melt it to vertical format
-    for jhu_var in jhu_variables:
-        tmp = pd.read_csv(os.path.join(jhu_dir, f"{jhu_var}.csv"))
-        country_cols = list(tmp.columns)
-        country_cols.remove("date")
-
-        # Carrying last observation forward for International totals to avoid discrepancies
-        if jhu_var[:5] == "total":
-            tmp = tmp.sort_values("date")
-            tmp["International"] = tmp["International"].ffill()
-
-        tmp = (
-            pd.melt(tmp, id_vars="date", value_vars=country_cols)
-            .rename(columns={"value": jhu_var, "variable": "location"})
-            .dropna()
-        )
-
-        if jhu_var[:7] == "weekly_":
-            tmp[jhu_var] = tmp[jhu_var].div(7).round(3)
-            tmp = tmp.rename(
-                errors="ignore",
-                columns={
-                    "weekly_cases": "new_cases_smoothed",
-                    "weekly_deaths": "new_deaths_smoothed",
-                    "weekly_cases_per_million": "new_cases_smoothed_per_million",
-                    "weekly_deaths_per_million": "new_deaths_smoothed_per_million",
-                },
-            )
-        else:
-            tmp[jhu_var] = tmp[jhu_var].round(3)
-        data_frames.append(tmp)
-
-    # Outer join between all files
-    jhu = reduce(
-        lambda left, right: pd.merge(left, right, on=["date", "location"], how="outer"),
-        data_frames,
-    )
+    dates = wide[JHU_VARIABLES[0]].index
+    locations = wide[JHU_VARIABLES[0]].columns
+    for tmp in wide.values():
+        dates = dates.union(tmp.index)
+        locations = locations.union(tmp.columns)
+    dates, locations = dates.sort_values(), locations.sort_values()
+
+    # (date, location) grid: rows sorted by date, then location
+    values = {
+        RENAME_WEEKLY.get(jhu_var, jhu_var): tmp.reindex(index=dates, columns=locations).to_numpy().ravel()
+        for jhu_var, tmp in wide.items()
+    }
+    mask = np.zeros(len(dates) * len(locations), dtype=bool)
+    for v in values.values():
+        mask |= ~np.isnan(v)
+    positions = np.flatnonzero(mask)
 
+    jhu = pd.DataFrame(
+        {
+            "date": dates.to_numpy().take(positions // len(locations)),
+            "location": pd.Categorical.from_codes(positions % len(locations), categories=locations),
+        }
+    )
+    for col, v in values.items():
+        jhu[col] = _compact(v[positions])
     return jhu
@@ -1,6 +1,37 @@
+import json
 import os
 import pandas as pd
 
+from cowidev.megafile.cache import cached, file_hash
+
+
+def _build_macro_table(macro_variables: dict, data_dir: str) -> pd.DataFrame:
+    var_dfs = []
+    for var, file in macro_variables.items():
+        var_df = pd.read_csv(os.path.join(data_dir, file), usecols=["iso_code", var])
+        var_df = var_df[-var_df["iso_code"].isnull()]
+        if var_df["iso_code"].duplicated().any():
+            raise ValueError(f"Multiple values for the same iso_code in {file}")
+        var_df[var] = var_df[var].round(3)
+        # Nullable integers, so that integer variables are not converted to float when missing for some iso_code
+        if pd.api.types.is_integer_dtype(var_df[var]):
+            var_df[var] = var_df[var].astype("Int64")
+        var_dfs.append(var_df.set_index("iso_code"))
+    return pd.concat(var_dfs, axis=1).rename_axis("iso_code").reset_index()
+
+
+def get_macro_table(macro_variables: dict, data_dir: str) -> tuple:
+    """
+    Builds the table of 'macro' variables, with one row per iso_code and one column per variable.
+    The table is cached and only built again if any of the source files changes.
+
+    Returns:
+        tuple: macro table {dataframe} and whether it was found in cache.
+    """
+    filepaths = [os.path.join(data_dir, file) for file in macro_variables.values()]
+    key = f"{file_hash(*filepaths)}-{json.dumps(macro_variables)}"
+    return cached("macro", key, _build_macro_table, macro_variables=macro_variables, data_dir=data_dir)
+
 
 def add_macro_variables(complete_dataset: pd.DataFrame, macro_variables: dict, data_dir: str):
     """
@@ -8,14 +39,16 @@ def add_macro_variables(complete_dataset: pd.DataFrame, macro_variables: dict, d
     The data is denormalized, i.e. each yearly value (for example GDP per capita)
     is added to each row of the complete dataset. This is meant to facilitate the use
     of our dataset by non-experts.
+
+    All variables are added at once, from the macro table (see `get_macro_table`).
     """
     original_shape = complete_dataset.shape
 
-    for var, file in macro_variables.items():
-        var_df = pd.read_csv(os.path.join(data_dir, file), usecols=["iso_code", var])
-        var_df = var_df[-var_df["iso_code"].isnull()]
-        var_df[var] = var_df[var].round(3)
-        complete_dataset = complete_dataset.merge(var_df, on="iso_code", how="left")
+    macro, is_cached = get_macro_table(macro_variables, data_dir)
+    print(f"Adding macro variables{' (cached)' if is_cached else ''}…")
+    complete_dataset = complete_dataset.merge(macro, on="iso_code", how="left")
+    for var in macro.select_dtypes("Int64").columns:
+        complete_dataset[var] = complete_dataset[var].astype(float if complete_dataset[var].isnull().any() else int)
 
     assert complete_dataset.shape[0] == original_shape[0]
     assert complete_dataset.shape[1] == original_shape[1] + len(macro_variables)
@@ -1,5 +1,6 @@
 from .scraping import get_soup, get_driver, request_json
-from .download import read_xlsx_from_url
+from .download import read_xlsx_from_url, read_csv_from_url
+from .session import fetch, prefetch
 
 
-__all__ = ["get_soup", "get_driver", "request_json", "read_xlsx_from_url"]
+__all__ = ["get_soup", "get_driver", "request_json", "read_xlsx_from_url", "read_csv_from_url", "fetch", "prefetch"]
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+
+HEADERS_STORED = ["Content-Type", "ETag", "Last-Modified"]
+
+
+class HttpCache:
+    def __init__(self, folder: str, ttl: float = 0, max_size: int = 1024 ** 3, offline: bool = False):
+        """On-disk cache for GET responses, keyed by URL and request parameters.
+
+        Responses are stored with their `ETag` and `Last-Modified` headers. Once an entry is older than `ttl`, it is
+        revalidated with a conditional request (`If-None-Match`/`If-Modified-Since`), so unchanged sources are not
+        downloaded again. Least recently used entries are evicted when the cache exceeds `max_size`.
+
+        Args:
+            folder (str): Cache directory.
+            ttl (float, optional): Seconds during which an entry is served without contacting the server. Defaults to
+                                    0 (always revalidate).
+            max_size (int, optional): Maximum size of cached bodies, in bytes. Defaults to 1 GB.
+            offline (bool, optional): Serve all requests from cache and never contact the server (entries not cached
+                                        raise ConnectionError). Defaults to False.
+        """
+        self.folder = folder
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _key(self, url: str, params: dict = None) -> str:
+        params = sorted((params or {}).items())
+        return hashlib.sha256(json.dumps([url, params], default=str).encode()).hexdigest()
+
+    def _paths(self, key: str) -> tuple:
+        return os.path.join(self.folder, f"{key}.json"), os.path.join(self.folder, f"{key}.body")
+
+    def _load(self, key: str):
+        path_meta, path_body = self._paths(key)
+        try:
+            with open(path_meta) as f:
+                meta = json.load(f)
+            with open(path_body, "rb") as f:
+                body = f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+        return meta, body
+
+    def _write_meta(self, key: str, meta: dict):
+        path_meta, _ = self._paths(key)
+        with open(path_meta, "w") as f:
+            json.dump(meta, f)
+
+    def _store(self, key: str, response: requests.Response):
+        meta = {
+            "url": response.url,
+            "headers": {k: response.headers[k] for k in HEADERS_STORED if k in response.headers},
+            "encoding": response.encoding,
+            "size": len(response.content),
+            "stored_at": time.time(),
+            "accessed_at": time.time(),
+        }
+        _, path_body = self._paths(key)
+        with self._lock:
+            with open(path_body, "wb") as f:
+                f.write(response.content)
+            self._write_meta(key, meta)
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        for filename in os.listdir(self.folder):
+            if filename.endswith(".json"):
+                try:
+                    with open(os.path.join(self.folder, filename)) as f:
+                        meta = json.load(f)
+                except ValueError:
+                    continue
+                entries.append((meta["accessed_at"], meta["size"], filename[: -len(".json")]))
+        size = sum(e[1] for e in entries)
+        for _, entry_size, key in sorted(entries):
+            if size <= self.max_size:
+                break
+            for path in self._paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+            size -= entry_size
+
+    def _response(self, key: str, meta: dict, body: bytes) -> requests.Response:
+        meta["accessed_at"] = time.time()
+        with self._lock:
+            self._write_meta(key, meta)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = meta["url"]
+        response.headers.update(meta["headers"])
+        response.encoding = meta["encoding"]
+        response._content = body
+        response._content_consumed = True
+        response.from_cache = True
+        return response
+
+    def fetch(self, send, url: str, params: dict = None) -> requests.Response:
+        """Get response for `url` from cache or, if missing or stale, from `send`.
+
+        Args:
+            send (callable): Function that requests `url`. It receives a dictionary with the extra (conditional)
+                                headers to send.
+            url (str): URL.
+            params (dict, optional): Request query parameters (part of the cache key). Defaults to None.
+
+        Returns:
+            requests.Response: Response.
+        """
+        key = self._key(url, params)
+        entry = self._load(key)
+        if entry is not None:
+            meta, body = entry
+            if self.offline or time.time() - meta["stored_at"] < self.ttl:
+                return self._response(key, meta, body)
+        if self.offline:
+            raise requests.ConnectionError(f"Offline mode: {url} is not cached!")
+        # Conditional request
+        headers = {}
+        if entry is not None:
+            if "ETag" in meta["headers"]:
+                headers["If-None-Match"] = meta["headers"]["ETag"]
+            if "Last-Modified" in meta["headers"]:
+                headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+        response = send(headers)
+        if response.status_code == 304 and entry is not None:
+            meta["stored_at"] = time.time()
+            return self._response(key, meta, body)
+        if response.status_code == 200:
+            self._store(key, response)
+        return response
@@ -1,7 +1,9 @@
-import requests
+import io
 import tempfile
 import pandas as pd
 
+from cowidev.utils.web.session import fetch
+
 
 def read_xlsx_from_url(url: str, as_series: bool = False, **kwargs) -> pd.DataFrame:
     """Download and load xls file from URL.
@@ -16,7 +18,7 @@ def read_xlsx_from_url(url: str, as_series: bool = False, **kwargs) -> pd.DataFr
         pandas.DataFrame: Data loaded.
     """
     headers = {"User-Agent": "Mozilla/5.0 (X11; Linux i686)"}
-    response = requests.get(url, headers=headers)
+    response = fetch(url, headers=headers)
     with tempfile.NamedTemporaryFile() as tmp:
         with open(tmp.name, "wb") as f:
             f.write(response.content)
@@ -26,8 +28,26 @@ def read_xlsx_from_url(url: str, as_series: bool = False, **kwargs) -> pd.DataFr
     return df
 
 
+def read_csv_from_url(url: str, **kwargs) -> pd.DataFrame:
+    """Download and load csv file from URL.
+
+    Unlike `pd.read_csv(url)`, the file is downloaded through the shared session (see `cowidev.utils.web.session`), so
+    connections are reused and prefetched responses are used.
+
+    Args:
+        url (str): File url.
+        kwargs: Arguments for pandas.read_csv.
+
+    Returns:
+        pandas.DataFrame: Data loaded.
+    """
+    response = fetch(url)
+    response.raise_for_status()
+    return pd.read_csv(io.BytesIO(response.content), **kwargs)
+
+
 def download_file_from_url(url, save_path, chunk_size=128):
-    r = requests.get(url, stream=True)
+    r = fetch(url, stream=True)
     with open(save_path, "wb") as fd:
         for chunk in r.iter_content(chunk_size=chunk_size):
             fd.write(chunk)
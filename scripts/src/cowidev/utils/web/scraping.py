@@ -1,12 +1,20 @@
 import json
+import threading
+import time
+from contextlib import contextmanager
 from urllib.error import HTTPError
 
 from bs4 import BeautifulSoup
-import requests
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options as ChroOpt
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.firefox.options import Options as FireOpt
 
+from cowidev.utils.web.session import fetch
+
+
+_driver_pool = None
+
 
 def get_headers() -> dict:
     """Get generic header for requests.
@@ -50,15 +58,9 @@ def get_soup(
     kwargs["headers"] = kwargs.get("headers", get_headers())
     kwargs["verify"] = kwargs.get("verify", True)
     kwargs["timeout"] = kwargs.get("timeout", 20)
-    try:
-        if request_method == "get":
-            response = requests.get(source, **kwargs)
-        elif request_method == "post":
-            response = requests.post(source, **kwargs)
-        else:
-            raise ValueError(f"Invalid value for `request_method`: {request_method}. Use 'get' or 'post'")
-    except Exception as err:
-        raise err
+    if request_method not in ["get", "post"]:
+        raise ValueError(f"Invalid value for `request_method`: {request_method}. Use 'get' or 'post'")
+    response = fetch(source, method=request_method, **kwargs)
     if not response.ok:
         raise HTTPError(f"Web {source} not found! {response.content}")
     content = response.content
@@ -104,18 +106,152 @@ def sel_options(headless: bool = True, firefox: bool = False):
     return op
 
 
-def get_driver(headless: bool = True, download_folder: str = None, options=None, firefox: bool = False):
+def _new_driver(headless: bool = True, options=None, firefox: bool = False):
     if options is None:
         options = sel_options(headless=headless, firefox=firefox)
     if firefox:
-        driver = webdriver.Firefox(options=options)
-    else:
-        driver = webdriver.Chrome(options=options)
+        return webdriver.Firefox(options=options)
+    return webdriver.Chrome(options=options)
+
+
+def get_driver(headless: bool = True, download_folder: str = None, options=None, firefox: bool = False):
+    """Get Selenium web driver. Use it as a context manager (`with get_driver() as driver: ...`).
+
+    If a driver pool is set (see `set_driver_pool`), the driver is borrowed from the pool and given back when the
+    context exits. Drivers with custom `options` are never pooled.
+    """
+    if _driver_pool is not None and options is None:
+        return _driver_pool.driver(headless=headless, download_folder=download_folder, firefox=firefox)
+    driver = _new_driver(headless=headless, options=options, firefox=firefox)
     if download_folder:
         set_download_settings(driver, download_folder)
     return driver
 
 
+class DriverPool:
+    def __init__(self, max_size: int = 4):
+        """Pool of web drivers shared by scrapers.
+
+        Browsers are started lazily and reused: when given back, extra windows are closed, cookies, cache and waits
+        are cleared and the default download behaviour is restored. Drivers that crashed are discarded and replaced
+        on next use. At most `max_size` browsers are alive at any time; callers block until one is free.
+
+        Args:
+            max_size (int, optional): Maximum number of browsers. Defaults to 4.
+        """
+        self.max_size = max_size
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []  # (key, driver)
+        self._num_alive = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def driver(self, headless: bool = True, download_folder: str = None, firefox: bool = False):
+        key = (headless, firefox)
+        driver = self._acquire(key)
+        try:
+            if download_folder and not firefox:
+                set_download_settings(driver, download_folder)
+            yield driver
+        finally:
+            self._release(key, driver)
+
+    def _acquire(self, key: tuple):
+        t0 = time.time()
+        self._slots.acquire()
+        self._local.wait_time = getattr(self._local, "wait_time", 0) + time.time() - t0
+        with self._lock:
+            driver = next((d for k, d in self._idle if k == key), None)
+            if driver is not None:
+                self._idle.remove((key, driver))
+            elif self._num_alive >= self.max_size:
+                # Make room by closing an idle browser of a different kind
+                _, driver_other = self._idle.pop(0)
+                self._num_alive -= 1
+                _quit_driver(driver_other)
+            if driver is None:
+                self._num_alive += 1
+        try:
+            if driver is not None and not _driver_alive(driver):
+                _quit_driver(driver)
+                driver = None
+            if driver is None:
+                driver = _new_driver(headless=key[0], firefox=key[1])
+        except Exception:
+            with self._lock:
+                self._num_alive -= 1
+            self._slots.release()
+            raise
+        return driver
+
+    def _release(self, key: tuple, driver):
+        try:
+            _reset_driver(driver, firefox=key[1])
+        except WebDriverException:
+            _quit_driver(driver)
+            with self._lock:
+                self._num_alive -= 1
+        else:
+            with self._lock:
+                self._idle.append((key, driver))
+        self._slots.release()
+
+    def pop_wait_time(self) -> float:
+        """Get time (seconds) the current thread waited for a free driver since last call."""
+        wait_time = getattr(self._local, "wait_time", 0)
+        self._local.wait_time = 0
+        return wait_time
+
+    def close(self):
+        """Quit all idle browsers."""
+        with self._lock:
+            for _, driver in self._idle:
+                _quit_driver(driver)
+            self._num_alive -= len(self._idle)
+            self._idle = []
+
+
+def _driver_alive(driver) -> bool:
+    try:
+        driver.window_handles
+    except WebDriverException:
+        return False
+    return True
+
+
+def _quit_driver(driver):
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass
+
+
+def _reset_driver(driver, firefox: bool = False):
+    for handle in driver.window_handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(driver.window_handles[0])
+    driver.delete_all_cookies()
+    if not firefox:
+        driver.command_executor._commands["send_command"] = (
+            "POST",
+            "/session/$sessionId/chromium/send_command",
+        )
+        for cmd in ["Network.clearBrowserCookies", "Network.clearBrowserCache"]:
+            driver.execute("send_command", {"cmd": cmd, "params": {}})
+        # Undo download folder set with `set_download_settings`, so that the next borrower does not download there
+        driver.execute("send_command", {"cmd": "Page.setDownloadBehavior", "params": {"behavior": "default"}})
+    driver.get("about:blank")
+    driver.implicitly_wait(0)
+
+
+def set_driver_pool(pool: DriverPool):
+    """Set pool used by `get_driver`. Use None to disable pooling."""
+    global _driver_pool
+    _driver_pool = pool
+
+
 def set_download_settings(driver, folder_name: str = None):
     if folder_name is None:
         folder_name = "/tmp"
@@ -0,0 +1,142 @@
+"""Shared HTTP layer: a single pooled session with per-host concurrency limits.
+
+All requests made with `fetch` reuse keep-alive connections from one `requests.Session`. Requests to the same host are
+capped at `MAX_CONNECTIONS_PER_HOST` at any time, regardless of how many threads are running. URLs known in advance
+can be downloaded concurrently with `prefetch`, so that network I/O overlaps before parsing starts. GET responses can
+also be kept on disk across runs (see `set_cache` and `cowidev.utils.web.cache.HttpCache`).
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+MAX_CONNECTIONS_PER_HOST = 4
+POOL_SIZE = 32
+
+_session = None
+_lock = threading.Lock()
+_host_semaphores = {}
+_prefetched = {}
+_cache = None
+
+
+def get_session() -> requests.Session:
+    """Get session shared by all requests (created on first call).
+
+    Returns:
+        requests.Session: Shared session.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+    return _session
+
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc
+    with _lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(MAX_CONNECTIONS_PER_HOST)
+        return _host_semaphores[host]
+
+
+def set_cache(cache):
+    """Set on-disk cache used by GET requests made with `fetch`.
+
+    Args:
+        cache (cowidev.utils.web.cache.HttpCache): Cache. Use None to disable caching.
+    """
+    global _cache
+    _cache = cache
+
+
+def _send(method: str, url: str, **kwargs) -> requests.Response:
+    # The host slot is released once the response headers are received. With `stream=True` the body is read after
+    # that, so streamed body downloads are not counted against `MAX_CONNECTIONS_PER_HOST`
+    with _host_semaphore(url):
+        return get_session().request(method, url, **kwargs)
+
+
+def _prefetch_key(url: str, kwargs: dict) -> tuple:
+    # Prefetched responses are only served to requests with the same arguments (e.g. `params`, `headers`, `verify`).
+    # `timeout` and `stream` do not change the response content
+    kwargs = {k: v for k, v in kwargs.items() if k not in ("timeout", "stream")}
+    return url, json.dumps(kwargs, sort_keys=True, default=str)
+
+
+def fetch(url: str, method: str = "get", **kwargs) -> requests.Response:
+    """Request `url` using the shared session.
+
+    GET requests to URLs previously downloaded with `prefetch` with the same arguments are served from memory (only
+    once, so that retries hit the network again). If a cache is set (see `set_cache`), GET requests go through it.
+
+    Args:
+        url (str): URL.
+        method (str, optional): HTTP method. Defaults to 'get'.
+        kwargs: Extra arguments passed to requests.Session.request.
+
+    Returns:
+        requests.Response: Response.
+
+    Note:
+        Requests to the same host are limited to `MAX_CONNECTIONS_PER_HOST` until response headers are received. With
+        `stream=True`, reading the body is not covered by this limit.
+    """
+    if method == "get":
+        with _lock:
+            response = _prefetched.pop(_prefetch_key(url, kwargs), None)
+        if response is not None:
+            return response
+        if _cache is not None:
+            headers = kwargs.pop("headers", None) or {}
+            return _cache.fetch(
+                lambda headers_extra: _send(method, url, headers={**headers, **headers_extra}, **kwargs),
+                url,
+                params=kwargs.get("params"),
+            )
+    return _send(method, url, **kwargs)
+
+
+def _prefetch_url(url: str, **kwargs):
+    try:
+        response = fetch(url, **kwargs)
+    except requests.RequestException:
+        return url, False
+    if response.ok:
+        with _lock:
+            _prefetched[_prefetch_key(url, kwargs)] = response
+    return url, response.ok
+
+
+def prefetch(urls: list, max_workers: int = 16, **kwargs) -> dict:
+    """Download `urls` concurrently and keep responses in memory for later `fetch` calls.
+
+    Responses are only served to `fetch` calls with the same `kwargs` (except `timeout` and `stream`). Failed downloads
+    are not kept, so that `fetch` requests them again (and raises the error there).
+
+    Args:
+        urls (list): URLs to download.
+        max_workers (int, optional): Number of threads. Defaults to 16.
+        kwargs: Extra arguments passed to requests.Session.request.
+
+    Returns:
+        dict: Success status by URL.
+    """
+    urls = list(dict.fromkeys(urls))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda url: _prefetch_url(url, **kwargs), urls)
+    return dict(results)
+
+
+def clear_prefetched():
+    """Drop all prefetched responses not used yet."""
+    with _lock:
+        _prefetched.clear()
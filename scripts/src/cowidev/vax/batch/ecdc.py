@@ -3,6 +3,7 @@ import os
 import pandas as pd
 
 from cowidev.utils.clean.dates import clean_date, localdate
+from cowidev.utils.web import read_csv_from_url
 from cowidev.vax.utils.files import export_metadata
 from cowidev.vax.utils.orgs import ECDC_VACCINES
 
@@ -75,15 +76,20 @@ columns = {
 }
 
 
+SOURCE_URL = "https://opendata.ecdc.europa.eu/covid19/vaccine_tracker/csv/data.csv"
+# Downloaded by `vax get` before running modules
+PREFETCH_URLS = [SOURCE_URL]
+
+
 class ECDC:
     def __init__(self, iso_path: str):
-        self.source_url = "https://opendata.ecdc.europa.eu/covid19/vaccine_tracker/csv/data.csv"
+        self.source_url = SOURCE_URL
         self.source_url_ref = "https://www.ecdc.europa.eu/en/publications-data/data-covid-19-vaccination-eu-eea"
         self.country_mapping = self._load_country_mapping(iso_path)
         self.vaccine_mapping = {**ECDC_VACCINES, "UNK": "Unknown"}
 
     def read(self):
-        return pd.read_csv(self.source_url)
+        return read_csv_from_url(self.source_url)
 
     def _load_country_mapping(self, iso_path: str):
         country_mapping = pd.read_csv(iso_path)
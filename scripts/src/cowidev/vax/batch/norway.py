@@ -2,10 +2,8 @@ import os
 import time
 
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-
 from cowidev.utils.clean import clean_date_series
+from cowidev.utils.web.scraping import get_driver
 
 
 class Norway:
@@ -14,32 +12,8 @@ class Norway:
         self.source_url = "https://www.fhi.no/sv/vaksine/koronavaksinasjonsprogrammet/koronavaksinasjonsstatistikk/"
 
     def read(self):
-        # Options for Chrome WebDriver
-        op = Options()
-        op.add_argument("--disable-notifications")
-        op.add_argument("--headless")
-        op.add_experimental_option(
-            "prefs",
-            {
-                "download.prompt_for_download": False,
-                "download.directory_upgrade": True,
-                "safebrowsing.enabled": True,
-            },
-        )
-
-        with webdriver.Chrome(options=op) as driver:
+        with get_driver(download_folder=".") as driver:
             driver.implicitly_wait(15)
-            # Setting Chrome to trust downloads
-            driver.command_executor._commands["send_command"] = (
-                "POST",
-                "/session/$sessionId/chromium/send_command",
-            )
-            params = {
-                "cmd": "Page.setDownloadBehavior",
-                "params": {"behavior": "allow", "downloadPath": "."},
-            }
-            _ = driver.execute("send_command", params)
-
             driver.get(self.source_url)
             element = driver.find_element_by_class_name("highcharts-exporting-group")
             time.sleep(2)
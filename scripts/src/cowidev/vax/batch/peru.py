@@ -1,18 +1,23 @@
 import pandas as pd
 
 from cowidev.utils.clean.dates import localdatenow
+from cowidev.utils.web import read_csv_from_url
 from cowidev.vax.utils.files import export_metadata
 
 
+SOURCE_URL = "https://github.com/jmcastagnetto/covid-19-peru-vacunas/raw/main/datos/vacunas_covid_resumen.csv"
+SOURCE_URL_AGE = (
+    "https://github.com/jmcastagnetto/covid-19-peru-vacunas/raw/main/datos/vacunas_covid_rangoedad_owid.csv"
+)
+# Downloaded by `vax get` before running modules
+PREFETCH_URLS = [SOURCE_URL, SOURCE_URL_AGE]
+
+
 class Peru:
     def __init__(self) -> None:
         self.location = "Peru"
-        self.source_url = (
-            "https://github.com/jmcastagnetto/covid-19-peru-vacunas/raw/main/datos/vacunas_covid_resumen.csv"
-        )
-        self.source_url_age = (
-            "https://github.com/jmcastagnetto/covid-19-peru-vacunas/raw/main/datos/vacunas_covid_rangoedad_owid.csv"
-        )
+        self.source_url = SOURCE_URL
+        self.source_url_age = SOURCE_URL_AGE
         self.source_url_ref = "https://www.datosabiertos.gob.pe/dataset/vacunacion"
         self.vaccine_mapping = {
             "SINOPHARM": "Sinopharm/Beijing",
@@ -21,13 +26,13 @@ class Peru:
         }
 
     def read(self):
-        return pd.read_csv(
+        return read_csv_from_url(
             self.source_url,
             usecols=["fecha_vacunacion", "fabricante", "dosis", "n_reg"],
         )
 
     def read_age(self):
-        return pd.read_csv(self.source_url_age)
+        return read_csv_from_url(self.source_url_age)
 
     def pipe_rename_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         df = df.rename(columns={"fecha_vacunacion": "date", "fabricante": "vaccine"})
@@ -8,7 +8,7 @@ from cowidev.vax.utils.paths import Paths
 
 def main():
     config = get_config()
-    paths = Paths(config.project_dir)
+    paths = Paths(config.project_dir, intermediate_format=config.intermediate_format)
     creds = config.CredentialsConfig()
 
     if config.display:
@@ -25,6 +25,11 @@ def main():
             modules_name=cfg.countries,
             skip_countries=cfg.skip_countries,
             gsheets_api=config.gsheets_api,
+            http_cache=cfg.http_cache,
+            http_cache_ttl=cfg.http_cache_ttl,
+            http_cache_max_size=cfg.http_cache_max_size,
+            offline=cfg.offline,
+            driver_pool_size=cfg.driver_pool_size,
         )
     if "process" in config.mode:
         cfg = config.ProcessDataConfig()
@@ -35,13 +40,19 @@ def main():
             skip_complete=cfg.skip_complete,
             skip_monotonic=cfg.skip_monotonic_check,
             skip_anomaly=cfg.skip_anomaly_check,
+            parallel=cfg.parallel,
+            n_jobs=cfg.njobs,
+            batch_checks=cfg.batch_checks,
         )
     if "generate" in config.mode:
         if config.check_r:
             test_check_with_r(paths=paths)
         else:
+            cfg = config.GenerateDatasetConfig()
             main_generate_dataset(
                 paths=paths,
+                full=cfg.full,
+                verify=cfg.verify,
             )
     if "export" in config.mode:
         main_export(paths=paths, url=creds.owid_cloud_table_post)
@@ -46,6 +46,10 @@ class ConfigParams(object):
         display,
         credentials_file,
         check_r=False,
+        full=False,
+        verify=False,
+        offline=False,
+        intermediate_format="csv",
     ):
         self._parallel = parallel
         self._njobs = njobs
@@ -53,6 +57,10 @@ class ConfigParams(object):
         self.mode = mode
         self.display = display
         self.check_r = check_r
+        self._full = full
+        self._verify = verify
+        self._offline = offline
+        self.intermediate_format = intermediate_format
         # Config file
         self.config_file = config_file
         self._config = self._load_yaml()
@@ -75,6 +83,10 @@ class ConfigParams(object):
             display=args.show_config,
             credentials_file=args.credentials,
             check_r=args.checkr,
+            full=args.full,
+            verify=args.verify,
+            offline=args.offline,
+            intermediate_format=args.intermediate_format,
         )
 
     @property
@@ -131,6 +143,11 @@ class ConfigParams(object):
         """Use `_token`/`id`/`secret` for variables that are secret"""
         return ConfigParamsStep(
             {
+                "http_cache": self._return_value_pipeline("get-data", "http_cache", True),
+                "http_cache_ttl": self._return_value_pipeline("get-data", "http_cache_ttl", 0),
+                "http_cache_max_size": self._return_value_pipeline("get-data", "http_cache_max_size", 1024),
+                "offline": self._return_value_pipeline("get-data", "offline", self._offline),
+                "driver_pool_size": self._return_value_pipeline("get-data", "driver_pool_size", 4),
                 "parallel": self._return_value_pipeline(
                     "get-data", "parallel", self._parallel
                 ),
@@ -175,11 +192,25 @@ class ConfigParams(object):
         """Use `_token`/`id`/`secret` for variables that are secret"""
         return ConfigParamsStep(
             {
+                "parallel": self._return_value_pipeline(
+                    "process-data", "parallel", self._parallel
+                ),
+                "njobs": self._return_value_pipeline("process-data", "njobs", self._njobs),
                 "skip_complete": self._return_value_pipeline(
                     "process-data", "skip_complete", []
                 ),
                 "skip_monotonic_check": self._get_skip_check("skip_monotonic_check"),
                 "skip_anomaly_check": self._get_skip_check("skip_anomaly_check"),
+                "batch_checks": self._return_value_pipeline("process-data", "batch_checks", True),
+            }
+        )
+
+    def GenerateDatasetConfig(self):
+        """Use `_token`/`id`/`secret` for variables that are secret"""
+        return ConfigParamsStep(
+            {
+                "full": self._return_value_pipeline("generate-dataset", "full", self._full),
+                "verify": self._return_value_pipeline("generate-dataset", "verify", self._verify),
             }
         )
 
@@ -251,7 +282,7 @@ class ConfigParams(object):
                 return v
             else:
                 return feature_from_args
-        except KeyError:
+        except (KeyError, TypeError):
             return feature_from_args
 
     def __str__(self):
@@ -265,6 +296,8 @@ class ConfigParams(object):
             s += f"Get Data: \n{self.GetDataConfig().__str__()}"
         if "process" in self.mode:
             s += f"Process Data: \n{self.ProcessDataConfig().__str__()}"
+        if "generate" in self.mode:
+            s += f"Generate Dataset: \n{self.GenerateDatasetConfig().__str__()}"
         s += "\n*************************\n\n"
         # s += f"Secrets: \n{self.CredentialsConfig().__str__()}"
         return s
@@ -60,7 +60,7 @@ def _parse_args():
         "-p",
         "--parallel",
         action="store_true",
-        help="Execution done in parallel (only in mode get-data).",
+        help="Execution done in parallel (only in modes get-data and process-data).",
     )
     parser.add_argument(
         "-j",
@@ -68,7 +68,37 @@ def _parse_args():
         default=-2,
         help=(
             "Number of jobs for parallel processing. Check Parallel class in joblib library for more info  (only in "
-            "mode get-data)."
+            "modes get-data and process-data)."
+        ),
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Only use cached responses of previous runs, without accessing the network (only in mode get-data).",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help=(
+            "Recompute all locations, ignoring cached results from previous runs (only in mode generate). By default,"
+            " only locations whose input data changed are recomputed."
+        ),
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help=(
+            "Compare incremental results against a full rebuild and raise an error if they differ (only in mode "
+            "generate)."
+        ),
+    )
+    parser.add_argument(
+        "--intermediate-format",
+        default="csv",
+        choices=["csv", "parquet", "feather"],
+        help=(
+            "Format of intermediate files exchanged by steps process and generate. Columnar formats (parquet, feather)"
+            " are faster to load. Public files are always CSV. Defaults to csv."
         ),
     )
     parser.add_argument(
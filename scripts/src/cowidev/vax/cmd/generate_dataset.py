@@ -1,19 +1,23 @@
 import os
-import itertools
+import hashlib
+import inspect
+import pickle
 from datetime import datetime
 from collections import ChainMap
-from math import isnan
 import glob
 import json
 import locale
 from shutil import copyfile
 
+import numpy as np
 import pandas as pd
+from pandas.api.indexers import BaseIndexer
 from pandas.api.types import is_numeric_dtype
 
 from cowidev.utils.utils import pd_series_diff_values
 from cowidev.utils.clean import clean_date
 from cowidev.vax.cmd.utils import get_logger
+from cowidev.vax.utils import store
 from cowidev.vax.utils.checks import VACCINES_ACCEPTED
 
 
@@ -26,16 +30,40 @@ class Bucket(object):
         self.__dict__.update(kwargs)
 
 
+class _SegmentWindowIndexer(BaseIndexer):
+    """Trailing window of `window_size` rows that does not extend before `segment_starts` (start of each row's
+    segment)."""
+
+    def _window_bounds(self, num_values: int) -> tuple:
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        start = np.maximum(end - self.window_size, self.segment_starts).astype(np.int64)
+        return start, end
+
+    # pandas requires the exact signature of BaseIndexer.get_window_bounds, which gained `step` in pandas 1.5
+    if "step" in inspect.signature(BaseIndexer.get_window_bounds).parameters:
+
+        def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+            return self._window_bounds(num_values)
+
+    else:
+
+        def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None):
+            return self._window_bounds(num_values)
+
+
 class DatasetGenerator:
-    def __init__(self, inputs, outputs, paths):
+    def __init__(self, inputs, outputs, paths, incremental=False, verify=False):
         # Inputs
         self.inputs = inputs
         # Outputs
         self.outputs = outputs
         # Others
         self.paths = paths
+        self.incremental = incremental
+        self.verify = verify
         self.aggregates = self.build_aggregates()
         self._countries_covered = None
+        self._cache_pending = None
 
     @property
     def column_names_int(self):
@@ -147,53 +175,52 @@ class DatasetGenerator:
             ]
         ]
 
-    def _get_aggregate(self, df, agg_name, included_locs, excluded_locs):
-        # Take rows that matter
-        agg = df[~df.location.isin(self.aggregates.keys())]  # remove aggregated rows
-        if excluded_locs is not None:
-            agg = agg[~agg.location.isin(excluded_locs)]
-        elif included_locs is not None:
-            agg = agg[agg.location.isin(included_locs)]
-
-        # Get full location-date grid
-        agg = (
-            pd.DataFrame(
-                itertools.product(agg.location.unique(), agg.date.unique()),
-                columns=[agg.location.name, agg.date.name],
-            )
-            .merge(agg, on=["date", "location"], how="outer")
-            .sort_values(by=["location", "date"])
-        )
+    def _get_aggregate_membership(self, locations: pd.Index) -> np.ndarray:
+        """Build (aggregate x location) boolean membership matrix, rows follow `self.aggregates` order."""
+        membership = np.ones((len(self.aggregates), len(locations)), dtype=bool)
+        for i, agg in enumerate(self.aggregates.values()):
+            if agg["excluded_locs"] is not None:
+                membership[i] = ~locations.isin(agg["excluded_locs"])
+            elif agg["included_locs"] is not None:
+                membership[i] = locations.isin(agg["included_locs"])
+        return membership
 
-        # NaN: Forward filling + Zero-filling if all metric is NaN
+    def pipe_aggregates(self, df: pd.DataFrame) -> pd.DataFrame:
+        logger.info(f"Building aggregate regions {list(self.aggregates.keys())}")
         cols = [
             "total_vaccinations",
             "people_vaccinated",
             "people_fully_vaccinated",
             "total_boosters",
         ]
-        grouper = agg.groupby("location")
-        for col in cols:
-            agg[col] = grouper[col].apply(lambda x: x.fillna(0) if x.isnull().all() else x.fillna(method="ffill"))
+        agg = df[~df.location.isin(self.aggregates.keys())]  # remove aggregated rows
 
-        # Aggregate
-        agg = agg.groupby("date").sum().reset_index().assign(location=agg_name)
+        # Dense (metric x location x date) array
+        loc_idx, locations = pd.factorize(agg.location, sort=True)
+        date_idx, dates = pd.factorize(agg.date, sort=True)
+        values = np.full((len(cols), len(locations), len(dates)), np.nan)
+        values[:, loc_idx, date_idx] = agg[cols].to_numpy(dtype=float).T
+        observed = np.zeros((len(locations), len(dates)), dtype=bool)
+        observed[loc_idx, date_idx] = True
+
+        # NaN: Forward filling along dates + Zero-filling remaining (leading or all-NaN) values
+        last_valid = np.where(~np.isnan(values), np.arange(len(dates)), 0)
+        np.maximum.accumulate(last_valid, axis=2, out=last_valid)
+        values = np.nan_to_num(np.take_along_axis(values, last_valid, axis=2), nan=0)
+
+        # Aggregate: Each region only spans the dates reported by at least one of its locations
+        membership = self._get_aggregate_membership(locations)
+        totals = membership.astype(float) @ values
+        agg_idx, agg_date_idx = np.nonzero(membership.astype(int) @ observed.astype(int))
+        agg = pd.DataFrame(
+            {
+                "date": dates[agg_date_idx],
+                **{col: totals[i, agg_idx, agg_date_idx] for i, col in enumerate(cols)},
+                "location": np.array(list(self.aggregates.keys()))[agg_idx],
+            }
+        )
         agg = agg[agg.date.dt.date < datetime.now().date()]
-        return agg
-
-    def pipe_aggregates(self, df: pd.DataFrame) -> pd.DataFrame:
-        logger.info(f"Building aggregate regions {list(self.aggregates.keys())}")
-        aggs = []
-        for agg_name, _ in self.aggregates.items():
-            aggs.append(
-                self._get_aggregate(
-                    df=df,
-                    agg_name=agg_name,
-                    included_locs=self.aggregates[agg_name]["included_locs"],
-                    excluded_locs=self.aggregates[agg_name]["excluded_locs"],
-                )
-            )
-        return pd.concat([df] + aggs, ignore_index=True)
+        return pd.concat([df, agg], ignore_index=True)
 
     def pipe_daily(self, df: pd.DataFrame) -> pd.DataFrame:
         logger.info("Adding daily metrics")
@@ -203,61 +230,70 @@ class DatasetGenerator:
         df = df.sort_values(["location", "date"])
         return df
 
-    def _add_smoothed(self, df: pd.DataFrame) -> pd.DataFrame:
-        # NEW VACCINATIONS
-        # Range where total_vaccinations is registered
-        dt_min = df.dropna(subset=["total_vaccinations"]).date.min()
-        dt_max = df.dropna(subset=["total_vaccinations"]).date.max()
-        df_nan = df[(df.date < dt_min) | (df.date > dt_max)]
-
-        # Add missing dates
-        df = df.merge(
-            pd.Series(pd.date_range(dt_min, dt_max), name="date"),
-            how="right",
-        ).sort_values(by="date")
-
-        # Calculate and add smoothed vars
-        df["new_vaccinations_smoothed"] = (
-            df.total_vaccinations.interpolate(method="linear")
-            .diff()
-            .rolling(7, min_periods=1)
-            .mean()
-            .apply(lambda x: round(x) if not isnan(x) else x)
+    def _smoothed_metric(self, values: np.ndarray, loc_idx: np.ndarray, offsets: np.ndarray) -> tuple:
+        """Smooth a cumulative metric on a daily (location, date) grid.
+
+        Within each location's range of reported values, the metric is linearly interpolated, differentiated and
+        averaged over a 7-day trailing window that never crosses location boundaries.
+
+        Args:
+            values (np.ndarray): Cumulative metric values, sorted by location and date.
+            loc_idx (np.ndarray): Location index of each value.
+            offsets (np.ndarray): Start position of each location block in `values` (plus total length at the end).
+
+        Returns:
+            tuple: Smoothed daily values and mask of rows within each location's reported range.
+        """
+        pos = np.arange(len(values))
+        valid = ~np.isnan(values)
+        smoothed = np.full(len(values), np.nan)
+        if not valid.any():
+            return smoothed, valid
+        # Range where metric is registered
+        first = np.minimum.reduceat(np.where(valid, pos, len(values)), offsets[:-1])
+        last = np.maximum.reduceat(np.where(valid, pos, -1), offsets[:-1])
+        in_range = (pos >= first[loc_idx]) & (pos <= last[loc_idx])
+        # Interpolate (range ends are always valid, so no value is interpolated across locations) and differentiate
+        interpolated = np.interp(pos[in_range], pos[valid], values[valid])
+        diff = np.diff(interpolated, prepend=np.nan)
+        segment_start = np.flatnonzero(np.diff(loc_idx[in_range], prepend=-1))
+        diff[segment_start] = np.nan
+        # Rolling average + rounding
+        window = _SegmentWindowIndexer(
+            window_size=7,
+            segment_starts=np.repeat(segment_start, np.diff(segment_start, append=len(diff))),
         )
-
-        # Add missing dates
-        df = pd.concat([df, df_nan], ignore_index=True).sort_values("date")
-        df.loc[:, "location"] = df.location.dropna().iloc[0]
-
-        # PEOPLE_VACCINATED
-        # Range where people_vaccinated is registered
-        dt_min = df.dropna(subset=["people_vaccinated"]).date.min()
-        dt_max = df.dropna(subset=["people_vaccinated"]).date.max()
-        df_nan = df[(df.date < dt_min) | (df.date > dt_max)]
-
-        # Add missing dates
-        df = df.merge(
-            pd.Series(pd.date_range(dt_min, dt_max), name="date"),
-            how="right",
-        ).sort_values(by="date")
-
-        # Calculate and add smoothed vars
-        df["new_people_vaccinated_smoothed"] = (
-            df.people_vaccinated.interpolate(method="linear")
-            .diff()
-            .rolling(7, min_periods=1)
-            .mean()
-            .apply(lambda x: round(x) if not isnan(x) else x)
-        )
-
-        # Add missing dates
-        df = pd.concat([df, df_nan], ignore_index=True).sort_values("date")
-        df.loc[:, "location"] = df.location.dropna().iloc[0]
-        return df
+        smoothed[in_range] = np.round(pd.Series(diff).rolling(window, min_periods=1).mean().to_numpy()) + 0.0
+        return smoothed, in_range
 
     def pipe_smoothed(self, df: pd.DataFrame) -> pd.DataFrame:
         logger.info("Adding smoothed variables")
-        return df.groupby("location").apply(self._add_smoothed).reset_index(drop=True)
+        df = df.sort_values(["location", "date"])
+        # Daily grid spanning all dates of each location
+        bounds = df.groupby("location").date.agg(["min", "max"])
+        ndays = (bounds["max"] - bounds["min"]).dt.days.to_numpy() + 1
+        offsets = np.concatenate([[0], np.cumsum(ndays)])
+        loc_idx = np.repeat(np.arange(len(bounds)), ndays)
+        day = np.arange(offsets[-1]) - offsets[loc_idx]
+        grid = pd.DataFrame(
+            {
+                "location": bounds.index[loc_idx],
+                "date": bounds["min"].to_numpy()[loc_idx] + day.astype("timedelta64[D]"),
+            }
+        ).merge(df.assign(_observed=True), on=["location", "date"], how="left", validate="one_to_one")
+        # Smoothed metrics
+        keep = grid.pop("_observed").notna().to_numpy()
+        for metric, metric_smoothed in [
+            ("total_vaccinations", "new_vaccinations_smoothed"),
+            ("people_vaccinated", "new_people_vaccinated_smoothed"),
+        ]:
+            values = grid[metric].to_numpy(dtype=float)
+            grid[metric_smoothed], in_range = self._smoothed_metric(values, loc_idx, offsets)
+            keep |= in_range
+        # Keep original dates + dates within the range of each metric
+        return grid[df.columns.tolist() + ["new_vaccinations_smoothed", "new_people_vaccinated_smoothed"]][
+            keep
+        ].reset_index(drop=True)
 
     def get_population(self, df_subnational: pd.DataFrame) -> pd.DataFrame:
         # Build population dataframe
@@ -282,6 +318,10 @@ class DatasetGenerator:
         pop = pop.groupby("location", as_index=False).sum()
         return pop
 
+    def _get_countries_covered(self, locations, df_subnational: pd.DataFrame) -> list:
+        ncountries = df_subnational.location.tolist() + list(self.aggregates.keys())
+        return list(filter(lambda x: x not in ncountries, locations))
+
     def pipe_capita(self, df: pd.DataFrame) -> pd.DataFrame:
         logger.info("Adding per-capita variables")
         # Get data
@@ -293,9 +333,7 @@ class DatasetGenerator:
             raise ValueError(f"Missing population data for {missing_locs}")
 
         # Get covered countries
-        locations = df.location.unique()
-        ncountries = df_subnational.location.tolist() + list(self.aggregates.keys())
-        self._countries_covered = list(filter(lambda x: x not in ncountries, locations))
+        self._countries_covered = self._get_countries_covered(df.location.unique(), df_subnational)
         # Obtain per-capita metrics
         df = df.assign(
             total_vaccinations_per_hundred=(df.total_vaccinations * 100 / df.population).round(2),
@@ -335,27 +373,121 @@ class DatasetGenerator:
         df[count_cols] = df[count_cols].astype("Int64").fillna(pd.NA)
         return df
 
+    def pipeline_vaccinations_base(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df[
+            [
+                "date",
+                "location",
+                "total_vaccinations",
+                "people_vaccinated",
+                "people_fully_vaccinated",
+                "total_boosters",
+            ]
+        ].pipe(self.pipe_aggregates)
+
+    def pipeline_vaccinations_derived(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Location-wise metrics (daily, smoothed and per-capita). Rows of a location only depend on its base rows."""
+        return df.pipe(self.pipe_daily).pipe(self.pipe_smoothed).pipe(self.pipe_capita)
+
     def pipeline_vaccinations(self, df: pd.DataFrame) -> pd.DataFrame:
         return (
-            df[
-                [
-                    "date",
-                    "location",
-                    "total_vaccinations",
-                    "people_vaccinated",
-                    "people_fully_vaccinated",
-                    "total_boosters",
-                ]
-            ]
-            .pipe(self.pipe_aggregates)
-            .pipe(self.pipe_daily)
-            .pipe(self.pipe_smoothed)
-            .pipe(self.pipe_capita)
+            df.pipe(self.pipeline_vaccinations_base)
+            .pipe(self.pipeline_vaccinations_derived)
             .pipe(self.pipe_vax_checks)
             .pipe(self.pipe_to_int)
             .sort_values(by=["location", "date"])
         )
 
+    def _hash_inputs(self) -> str:
+        """Hash of static input files and of the pipeline code (this module). Any change in these invalidates the
+        cache."""
+        files = [
+            inspect.getsourcefile(type(self)),
+            self.inputs.population,
+            self.inputs.population_sub,
+            self.inputs.continent_countries,
+            self.inputs.eu_countries,
+            self.inputs.income_groups,
+            self.inputs.income_groups_compl,
+        ]
+        md5 = hashlib.md5()
+        for filename in files:
+            with open(filename, "rb") as f:
+                md5.update(f.read())
+        return md5.hexdigest()
+
+    def _hash_locations(self, df: pd.DataFrame) -> dict:
+        """Content hash of the rows of each location (including aggregates)."""
+        df = df.sort_values(["location", "date"])
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        locations, starts = np.unique(df.location.to_numpy(), return_index=True)
+        ends = np.append(starts[1:], len(df))
+        return {
+            location: hashlib.md5(row_hashes[start:end].tobytes()).hexdigest()
+            for location, start, end in zip(locations, starts, ends)
+        }
+
+    def _load_cache(self, inputs_hash: str) -> tuple:
+        """Load manifest and derived frame from last run. Returns empty cache if missing or stale."""
+        try:
+            with open(self.paths.tmp_vax_cache_manifest) as f:
+                manifest = json.load(f)
+            if manifest.get("inputs") != inputs_hash:
+                logger.info("Static inputs or code changed, cache is discarded")
+                return {}, None
+            location_hashes = manifest["locations"]
+            df = pd.read_pickle(self.paths.tmp_vax_cache_derived)
+        except (FileNotFoundError, ValueError, EOFError, KeyError, pickle.UnpicklingError):
+            logger.info("No valid cache found")
+            return {}, None
+        return location_hashes, df
+
+    def _save_cache(self, inputs_hash: str, location_hashes: dict, df: pd.DataFrame):
+        os.makedirs(os.path.dirname(self.paths.tmp_vax_cache_manifest), exist_ok=True)
+        df.to_pickle(self.paths.tmp_vax_cache_derived)
+        with open(self.paths.tmp_vax_cache_manifest, "w") as f:
+            json.dump({"inputs": inputs_hash, "locations": location_hashes}, f, indent=2)
+
+    def pipeline_vaccinations_incremental(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Same as `pipeline_vaccinations`, but only recomputes the locations (and aggregates) whose base rows
+        changed since the last run. Derived rows of the remaining locations are taken from the cache.
+
+        The updated cache is not stored here, but by `run` once the output passed checks and verification (see
+        `_cache_pending`)."""
+        df = df.pipe(self.pipeline_vaccinations_base)
+        inputs_hash = self._hash_inputs()
+        location_hashes = self._hash_locations(df)
+        cached_hashes, df_cached = self._load_cache(inputs_hash)
+        changed = [loc for loc, h in location_hashes.items() if cached_hashes.get(loc) != h]
+        logger.info(f"Recomputing {len(changed)}/{len(location_hashes)} locations")
+
+        dfs = []
+        if df_cached is not None:
+            dfs.append(df_cached[df_cached.location.isin(set(location_hashes) - set(changed))])
+        if changed:
+            dfs.append(df[df.location.isin(changed)].pipe(self.pipeline_vaccinations_derived))
+        df = pd.concat(dfs, ignore_index=True).sort_values(["location", "date"]).reset_index(drop=True)
+        df_subnational = pd.read_csv(self.inputs.population_sub, usecols=["location"])
+        self._countries_covered = self._get_countries_covered(df.location.unique(), df_subnational)
+        # Copy, as `pipe_to_int` converts columns in place and the cache keeps the derived (float) columns
+        df_checked = df.copy().pipe(self.pipe_vax_checks).pipe(self.pipe_to_int)
+        self._cache_pending = (inputs_hash, location_hashes, df)
+        return df_checked
+
+    def pipe_vaccinations_verify(self, df: pd.DataFrame, df_raw: pd.DataFrame) -> pd.DataFrame:
+        """Compare (incremental) output `df` against a full rebuild from `df_raw`."""
+        logger.info("Verifying incremental output against full rebuild")
+        df_full = df_raw.pipe(self.pipeline_vaccinations)
+        hashes = self._hash_locations(df)
+        hashes_full = self._hash_locations(df_full)
+        locations_wrong = sorted(
+            loc for loc in set(hashes) | set(hashes_full) if hashes.get(loc) != hashes_full.get(loc)
+        )
+        if locations_wrong:
+            raise ValueError(f"Incremental output differs from full rebuild! Check locations {locations_wrong}")
+        logger.info("Incremental output matches full rebuild")
+        return df
+
     def pipe_vaccinations_csv(self, df: pd.DataFrame, df_iso: pd.DataFrame) -> pd.DataFrame:
         return df.merge(df_iso, on="location").rename(
             columns={
@@ -680,12 +812,19 @@ class DatasetGenerator:
         copyfile(self.paths.tmp_vax_metadata_man, self.paths.pub_vax_metadata_man)
         copyfile(self.paths.tmp_vax_metadata_age, self.paths.pub_vax_metadata_age)
 
+    def _read_input(self, path: str) -> pd.DataFrame:
+        """Read intermediate file, with the same dtypes regardless of its format (as read from CSV)."""
+        df = store.read(path, categories=False)
+        for col in df.select_dtypes("Int64").columns:
+            df[col] = df[col].astype(float if df[col].hasnans else int)
+        return df
+
     def run(self):
         print("-- Generating dataset... --")
         logger.info("1/10 Loading input data...")
         try:
-            df_metadata = pd.read_csv(self.inputs.metadata)
-            df_vaccinations = pd.read_csv(self.inputs.vaccinations, parse_dates=["date"])
+            df_metadata = store.read(self.inputs.metadata)
+            df_vaccinations = self._read_input(self.inputs.vaccinations)
         except FileNotFoundError:
             raise FileNotFoundError(
                 "Internal files not found! Make sure to run `proccess-data` step prior to running `generate-dataset`."
@@ -693,12 +832,12 @@ class DatasetGenerator:
         df_iso = pd.read_csv(self.inputs.iso)
         files_manufacturer = glob.glob(self.inputs.manufacturer)
         df_manufacturer = pd.concat(
-            (pd.read_csv(filepath, parse_dates=["date"]) for filepath in files_manufacturer),
+            (self._read_input(filepath) for filepath in files_manufacturer),
             ignore_index=True,
         )
         files_age = glob.glob(self.inputs.age)
         df_age = pd.concat(
-            (pd.read_csv(filepath, parse_dates=["date"]) for filepath in files_age),
+            (self._read_input(filepath) for filepath in files_age),
             ignore_index=True,
         )
 
@@ -710,7 +849,16 @@ class DatasetGenerator:
 
         # Vaccinations
         logger.info("4/10 Generating `vaccinations` table...")
-        df_vaccinations_base = df_vaccinations.pipe(self.pipeline_vaccinations)
+        if self.incremental:
+            df_vaccinations_base = df_vaccinations.pipe(self.pipeline_vaccinations_incremental)
+        else:
+            df_vaccinations_base = df_vaccinations.pipe(self.pipeline_vaccinations)
+        if self.verify:
+            df_vaccinations_base = df_vaccinations_base.pipe(self.pipe_vaccinations_verify, df_vaccinations)
+        # Store incremental cache only now, so that output failing checks or verification is not reused next run
+        if self._cache_pending is not None:
+            self._save_cache(*self._cache_pending)
+            self._cache_pending = None
         df_vaccinations = df_vaccinations_base.pipe(self.pipe_vaccinations_csv, df_iso)
         logger.info("5/10 Generating `vaccinations` json...")
         json_vaccinations = df_vaccinations.pipe(self.pipe_vaccinations_json)
@@ -751,7 +899,7 @@ class DatasetGenerator:
         self._cp_locations_files()
 
 
-def main_generate_dataset(paths):
+def main_generate_dataset(paths, full=False, verify=False):
     # Select columns
     # TODO: Paths might better defined in vax.utils.paths.Paths
     inputs = Bucket(
@@ -765,11 +913,8 @@ def main_generate_dataset(paths):
         eu_countries=os.path.join(paths.project_dir, "scripts/input/owid/eu_countries.csv"),
         income_groups=os.path.join(paths.project_dir, "scripts/input/wb/income_groups.csv"),
         income_groups_compl=os.path.join(paths.project_dir, "scripts/input/owid/income_groups_complement.csv"),
-        manufacturer=os.path.join(
-            paths.project_dir,
-            "scripts/output/vaccinations/by_manufacturer/*.csv",
-        ),
-        age=os.path.join(paths.project_dir, "scripts/output/vaccinations//by_age_group/*.csv"),
+        manufacturer=paths.tmp_vax_man,
+        age=paths.tmp_vax_age,
     )
     outputs = Bucket(
         locations=os.path.join(paths.project_dir, "public/data/vaccinations/locations.csv"),
@@ -809,7 +954,7 @@ def main_generate_dataset(paths):
         ),
         html_table=os.path.abspath(os.path.join(paths.project_dir, "scripts/output/vaccinations/source_table.html")),
     )
-    generator = DatasetGenerator(inputs, outputs, paths)
+    generator = DatasetGenerator(inputs, outputs, paths, incremental=not full, verify=verify)
     generator.run()
 
     # Export timestamp
@@ -4,6 +4,9 @@ import importlib
 from joblib import Parallel, delayed
 import pandas as pd
 
+from cowidev.utils.web.cache import HttpCache
+from cowidev.utils.web.scraping import DriverPool, set_driver_pool
+from cowidev.utils.web.session import prefetch, clear_prefetched, set_cache
 from cowidev.vax.batch import __all__ as batch_countries
 from cowidev.vax.incremental import __all__ as incremental_countries
 from cowidev.vax.cmd.utils import get_logger, print_eoe
@@ -25,21 +28,33 @@ modules_name = modules_name_batch + modules_name_incremental
 
 
 class CountryDataGetter:
-    def __init__(self, paths: str, skip_countries: list, gsheets_api):
+    def __init__(self, paths: str, skip_countries: list, gsheets_api, driver_pool: DriverPool = None):
         self.paths = paths
         self.skip_countries = skip_countries
         self.gsheets_api = gsheets_api
+        self.driver_pool = driver_pool
+
+    def get_prefetch_urls(self, modules_name: list) -> list:
+        """Collect URLs declared by modules in `PREFETCH_URLS`."""
+        urls = []
+        for module_name in modules_name:
+            if module_name.split(".")[-1].lower() not in self.skip_countries:
+                module = importlib.import_module(module_name)
+                urls.extend(getattr(module, "PREFETCH_URLS", []))
+        return urls
 
     def run(self, module_name: str):
         t0 = time.time()
         country = module_name.split(".")[-1]
         if country.lower() in self.skip_countries:
             logger.info(f"{module_name}: skipped! ⚠️")
-            return {"module_name": module_name, "success": None, "skipped": True, "time": None}
+            return {"module_name": module_name, "success": None, "skipped": True, "time": None, "driver_wait": None}
         args = [self.paths]
         if country == "colombia":
             args.append(self.gsheets_api)
         logger.info(f"{module_name}: started")
+        if self.driver_pool is not None:
+            self.driver_pool.pop_wait_time()
         module = importlib.import_module(module_name)
         try:
             module.main(*args)
@@ -50,7 +65,14 @@ class CountryDataGetter:
             success = True
             logger.info(f"{module_name}: SUCCESS ✅")
         t = round(time.time() - t0, 2)
-        return {"module_name": module_name, "success": success, "skipped": False, "time": t}
+        driver_wait = round(self.driver_pool.pop_wait_time(), 2) if self.driver_pool is not None else None
+        return {
+            "module_name": module_name,
+            "success": success,
+            "skipped": False,
+            "time": t,
+            "driver_wait": driver_wait,
+        }
 
 
 def main_get_data(
@@ -60,15 +82,52 @@ def main_get_data(
     modules_name: list = modules_name,
     skip_countries: list = [],
     gsheets_api=None,
+    http_cache: bool = True,
+    http_cache_ttl: float = 0,
+    http_cache_max_size: int = 1024,
+    offline: bool = False,
+    driver_pool_size: int = 4,
 ):
     """Get data from sources and export to output folder.
 
     Is equivalent to script `run_python_scripts.py`
+
+    Downloads made through `cowidev.utils.web` are cached on disk (`http_cache`). Cached sources are revalidated
+    with conditional requests once they are older than `http_cache_ttl` seconds, so unchanged sources are not
+    downloaded again (e.g. in the retry pass). Use `offline` to only replay cached responses. `http_cache_max_size` is
+    given in MB.
+
+    Selenium drivers (`cowidev.utils.web.scraping.get_driver`) are borrowed from a pool of at most
+    `driver_pool_size` browsers, which are started on first use and reused across modules. Time spent by each module
+    waiting for a free browser is reported in the timing details. Use `driver_pool_size=0` to start one browser per
+    module instead.
     """
     t0 = time.time()
     print("-- Getting data... --")
+    if http_cache or offline:
+        set_cache(
+            HttpCache(
+                paths.tmp_vax_cache_http,
+                ttl=http_cache_ttl,
+                max_size=http_cache_max_size * 1024 ** 2,
+                offline=offline,
+            )
+        )
+    driver_pool = None
+    if driver_pool_size:
+        driver_pool = DriverPool(max_size=driver_pool_size)
+        set_driver_pool(driver_pool)
     skip_countries = [x.lower() for x in skip_countries]
-    country_data_getter = CountryDataGetter(paths, skip_countries, gsheets_api)
+    country_data_getter = CountryDataGetter(paths, skip_countries, gsheets_api, driver_pool)
+    # Download declared sources concurrently before running modules
+    prefetch_urls = country_data_getter.get_prefetch_urls(modules_name)
+    if prefetch_urls:
+        t_prefetch = time.time()
+        prefetched = prefetch(prefetch_urls)
+        logger.info(
+            f"Prefetched {sum(prefetched.values())}/{len(prefetched)} sources in {round(time.time() - t_prefetch, 2)}"
+            " seconds"
+        )
     if parallel:
         modules_execution_results = Parallel(n_jobs=n_jobs, backend="threading")(
             delayed(country_data_getter.run)(
@@ -84,10 +143,18 @@ def main_get_data(
                     module_name,
                 )
             )
+    clear_prefetched()
     # Get timing dataframe
     df_time = (
         pd.DataFrame(
-            [{"module": m["module_name"], "execution_time (sec)": m["time"]} for m in modules_execution_results]
+            [
+                {
+                    "module": m["module_name"],
+                    "execution_time (sec)": m["time"],
+                    "driver_wait (sec)": m["driver_wait"],
+                }
+                for m in modules_execution_results
+            ]
         )
         .set_index("module")
         .sort_values(by="execution_time (sec)", ascending=False)
@@ -101,6 +168,9 @@ def main_get_data(
     modules_execution_results = []
     for module_name in modules_failed:
         modules_execution_results.append(country_data_getter.run(module_name))
+    if driver_pool is not None:
+        driver_pool.close()
+        set_driver_pool(None)
     modules_failed_retrial = [m["module_name"] for m in modules_execution_results if m["success"] is False]
     if len(modules_failed_retrial) > 0:
         failed_str = "\n".join([f"* {m}" for m in modules_failed_retrial])
@@ -112,5 +182,7 @@ def main_get_data(
     print(f"Took {t_sec_1} seconds (i.e. {t_min_1} minutes).")
     print(f"Top 20 most time consuming scripts:")
     print(df_time.head(20))
+    if driver_pool is not None:
+        print(f"Waited {round(df_time['driver_wait (sec)'].sum(), 2)} seconds for a free web driver.")
     print(f"\nTook {t_sec_2} seconds (i.e. {t_min_2} minutes) [AFTER RETRIALS].")
     print_eoe()
@@ -1,7 +1,12 @@
+import glob
 import os
+import time
 
+from joblib import Parallel, delayed
 import pandas as pd
 
+from cowidev.vax.utils import store
+from cowidev.vax.utils.checks import BatchChecker
 from cowidev.vax.utils.gsheets import VaccinationGSheet
 from cowidev.vax.process import process_location
 from cowidev.vax.cmd.utils import get_logger, print_eoe
@@ -19,6 +24,94 @@ def read_csv(filepath):
         raise ParserError(f"Error tokenizing data from file {filepath}")
 
 
+class CountryDataProcessor:
+    def __init__(
+        self, paths, skip_complete: list, skip_monotonic: dict, skip_anomaly: dict, batch_checks: bool = False
+    ):
+        self.paths = paths
+        self.skip_complete = skip_complete
+        self.skip_monotonic = skip_monotonic
+        self.skip_anomaly = skip_anomaly
+        self.batch_checks = batch_checks
+
+    def run(self, df: pd.DataFrame):
+        t0 = time.time()
+        country = df.loc[0, "location"]
+        if country.lower() in self.skip_complete:
+            logger.info(f"{country}: SKIPPED 🚧")
+            return {"location": country, "success": None, "skipped": True, "time": None, "error": None, "df": None}
+        try:
+            df = process_location(
+                df,
+                monotonic_check_skip=self.skip_monotonic.get(country, []),
+                anomaly_check_skip=self.skip_anomaly.get(country, []),
+                checks=not self.batch_checks,
+            )
+            # Export (with batch checks, once all locations are checked)
+            if not self.batch_checks:
+                self.export(df)
+        except Exception as err:
+            success, error, df = False, f"{type(err).__name__}: {err}", None
+            logger.error(f"{country}: ❌ {err}")
+        else:
+            success, error = True, None
+            if not self.batch_checks:
+                logger.info(f"{country}: SUCCESS ✅")
+        t = round(time.time() - t0, 2)
+        return {"location": country, "success": success, "skipped": False, "time": t, "error": error, "df": df}
+
+    def export(self, df: pd.DataFrame):
+        df.to_csv(self.paths.pub_vax_loc(df.location.iloc[0]), index=False)
+
+    def check(self, results: list) -> pd.DataFrame:
+        """Check all processed locations at once and export those without violations.
+
+        Results of locations with violations are marked as failed.
+
+        Args:
+            results (list): Results from `run`.
+
+        Returns:
+            pd.DataFrame: Report with all violations, see `BatchChecker.run`.
+        """
+        results_ok = [r for r in results if r["success"]]
+        if not results_ok:
+            return pd.DataFrame(columns=["location", "date", "check", "metric", "message"])
+        report = BatchChecker.from_locations(
+            [r["df"] for r in results_ok],
+            monotonic_check_skip=self.skip_monotonic,
+            anomaly_check_skip=self.skip_anomaly,
+        ).run()
+        errors = report.groupby("location").check.agg(
+            lambda x: ", ".join(f"{check} ({count})" for check, count in x.value_counts(sort=False).items())
+        )
+        for r in results_ok:
+            country = r["location"]
+            if country in errors.index:
+                r.update(success=False, error=f"Checks failed: {errors[country]}", df=None)
+                logger.error(f"{country}: ❌ {r['error']}")
+            else:
+                self.export(r["df"])
+                logger.info(f"{country}: SUCCESS ✅")
+        return report
+
+
+def export_intermediate(paths, df: pd.DataFrame, df_metadata: pd.DataFrame):
+    """Export files used by step `generate`, in format `paths.intermediate_format`.
+
+    For columnar formats, manufacturer and age group files are also consolidated into a single file each.
+    """
+    store.write(df, paths.tmp_vax_all, store.SCHEMA_VACCINATIONS)
+    store.write(df_metadata, paths.tmp_met_all, store.SCHEMA_METADATA)
+    if paths.intermediate_format != "csv":
+        for path_glob, path_all, schema in [
+            (paths.tmp_vax_out_man("*"), paths.tmp_vax_man_all, store.SCHEMA_MANUFACTURER),
+            (paths.tmp_vax_out_by_age_group("*"), paths.tmp_vax_age_all, store.SCHEMA_AGE),
+        ]:
+            df = pd.concat((read_csv(filepath) for filepath in glob.glob(path_glob)), ignore_index=True)
+            store.write(df, path_all, schema)
+
+
 def main_process_data(
     paths,
     gsheets_api,
@@ -26,7 +119,16 @@ def main_process_data(
     skip_complete: list = None,
     skip_monotonic: dict = {},
     skip_anomaly: dict = {},
+    parallel: bool = False,
+    n_jobs: int = -2,
+    batch_checks: bool = True,
 ):
+    """Process data from all locations and export files for step `generate`.
+
+    With `batch_checks`, sanity checks run once on all processed locations (see `BatchChecker`), and all violations
+    are reported. Otherwise, each location is checked on its own and stops at its first violation.
+    """
+    t0 = time.time()
     print("-- Processing data... --")
     # Get data from sheets
     logger.info("Getting data from Google Spreadsheet...")
@@ -49,30 +151,48 @@ def main_process_data(
     common_locations = auto_locations.intersection(manual_locations)
     if len(common_locations) > 0:
         raise DataError(f"The following locations have data in both output/main_data and GSheet: {common_locations}")
+    for df in vax:
+        if "location" not in df:
+            raise ValueError(f"Column `location` missing. df: {df.tail(5)}")
 
     # vax = [v for v in vax if v.location.iloc[0] == "Pakistan"]  # DEBUG
     # Process locations
-    def _process_location(df):
-        monotonic_check_skip = skip_monotonic.get(df.loc[0, "location"], [])
-        anomaly_check_skip = skip_anomaly.get(df.loc[0, "location"], [])
-        return process_location(df, monotonic_check_skip, anomaly_check_skip)
-
     logger.info("Processing and exporting data...")
-    vax_valid = []
-    for df in vax:
-        if "location" not in df:
-            raise ValueError(f"Column `location` missing. df: {df.tail(5)}")
-        country = df.loc[0, "location"]
-        if country.lower() not in skip_complete:
-            df = _process_location(df)
-            vax_valid.append(df)
-            # Export
-            df.to_csv(paths.pub_vax_loc(country), index=False)
-            logger.info(f"{country}: SUCCESS ✅")
-        else:
-            logger.info(f"{country}: SKIPPED 🚧")
+    country_data_processor = CountryDataProcessor(
+        paths, skip_complete or [], skip_monotonic, skip_anomaly, batch_checks=batch_checks
+    )
+    if parallel:
+        results = Parallel(n_jobs=n_jobs)(delayed(country_data_processor.run)(df) for df in vax)
+    else:
+        results = [country_data_processor.run(df) for df in vax]
+    if batch_checks:
+        logger.info("Checking data...")
+        report = country_data_processor.check(results)
+
+    # Get timing dataframe
+    df_time = (
+        pd.DataFrame([{"location": r["location"], "execution_time (sec)": r["time"]} for r in results])
+        .set_index("location")
+        .sort_values(by="execution_time (sec)", ascending=False)
+    )
+    t_sec = round(time.time() - t0, 2)
+    print("---")
+    print("TIMING DETAILS")
+    print(f"Took {t_sec} seconds (i.e. {round(t_sec / 60, 2)} minutes).")
+    print(f"Top 20 most time consuming locations:")
+    print(df_time.head(20))
+
+    # Errors
+    if batch_checks and not report.empty:
+        print(f"\n---\n\nCHECKS\nThe following checks failed ({len(report)}):\n{report.to_string(index=False)}")
+    results_failed = [r for r in results if r["success"] is False]
+    if results_failed:
+        failed_str = "\n".join([f"* {r['location']}: {r['error']}" for r in results_failed])
+        print(f"\n---\n\nFAILED\nThe following locations failed to process ({len(results_failed)}):\n{failed_str}")
+        raise ValueError(f"Processing failed for {len(results_failed)} locations. Check errors above.")
+
+    vax_valid = [r["df"] for r in results if r["success"]]
     df = pd.concat(vax_valid).sort_values(by=["location", "date"])
-    df.to_csv(paths.tmp_vax_all, index=False)
-    gsheet.metadata.to_csv(paths.tmp_met_all, index=False)
+    export_intermediate(paths, df, gsheet.metadata)
     logger.info("Exported ✅")
     print_eoe()
@@ -3,7 +3,7 @@ from datetime import datetime
 import pandas as pd
 
 from cowidev.utils.clean import clean_date
-from cowidev.utils.web import request_json
+from cowidev.utils.web import request_json, read_csv_from_url
 from cowidev.vax.utils.incremental import increment
 from cowidev.vax.utils.orgs import WHO_VACCINES, ACDC_COUNTRIES, ACDC_VACCINES
 from cowidev.vax.cmd.utils import get_logger
@@ -84,7 +84,7 @@ class AfricaCDC:
 
     def pipe_vaccine_who(self, df: pd.DataFrame) -> pd.DataFrame:
         url = "https://covid19.who.int/who-data/vaccination-data.csv"
-        df_who = pd.read_csv(url, usecols=["ISO3", "VACCINES_USED"]).rename(columns={"VACCINES_USED": "vaccine"})
+        df_who = read_csv_from_url(url, usecols=["ISO3", "VACCINES_USED"]).rename(columns={"VACCINES_USED": "vaccine"})
         df_who = df_who.dropna(subset=["vaccine"])
         df = df.merge(df_who, left_on="ISO_3_CODE", right_on="ISO3")
         df = df.assign(
@@ -1,9 +1,7 @@
 import re
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-
 from cowidev.utils.clean import clean_count, clean_date
+from cowidev.utils.web.scraping import get_driver
 from cowidev.vax.utils.incremental import increment
 
 
@@ -15,9 +13,7 @@ def main(paths):
         "vaccine": "Moderna, Oxford/AstraZeneca",
     }
 
-    op = Options()
-    op.add_argument("--headless")
-    with webdriver.Chrome(options=op) as driver:
+    with get_driver() as driver:
         driver.maximize_window()  # For maximizing window
         driver.implicitly_wait(20)  # gives an implicit wait for 20 seconds
         driver.get(data["source_url"])
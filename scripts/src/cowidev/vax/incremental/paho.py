@@ -5,6 +5,7 @@ from glob import glob
 import pandas as pd
 
 from cowidev.utils.clean import clean_date
+from cowidev.utils.web import read_csv_from_url
 from cowidev.utils.web.scraping import get_soup, get_driver
 from cowidev.vax.utils.files import get_file_encoding
 from cowidev.vax.utils.incremental import increment
@@ -130,7 +131,7 @@ class PAHO:
 
     def pipe_vaccine(self, df: pd.DataFrame) -> pd.DataFrame:
         url = "https://covid19.who.int/who-data/vaccination-data.csv"
-        df_who = pd.read_csv(url, usecols=["ISO3", "VACCINES_USED"]).rename(columns={"VACCINES_USED": "vaccine"})
+        df_who = read_csv_from_url(url, usecols=["ISO3", "VACCINES_USED"]).rename(columns={"VACCINES_USED": "vaccine"})
         df_who = df_who.dropna(subset=["vaccine"])
         df_who = df_who.assign(
             vaccine=df_who.vaccine.apply(
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 
+from cowidev.utils.web import read_csv_from_url
 from cowidev.vax.utils.incremental import increment
 from cowidev.vax.utils.checks import VACCINES_ONE_DOSE
 from cowidev.vax.utils.orgs import WHO_VACCINES, WHO_COUNTRIES
@@ -18,13 +19,18 @@ ADDITIONAL_VACCINES_USED = {
 }
 
 
+SOURCE_URL = "https://covid19.who.int/who-data/vaccination-data.csv"
+# Downloaded by `vax get` before running modules
+PREFETCH_URLS = [SOURCE_URL]
+
+
 class WHO:
     def __init__(self) -> None:
-        self.source_url = "https://covid19.who.int/who-data/vaccination-data.csv"
+        self.source_url = SOURCE_URL
         self.source_url_ref = "https://covid19.who.int/"
 
     def read(self) -> pd.DataFrame:
-        return pd.read_csv(self.source_url)
+        return read_csv_from_url(self.source_url)
 
     def pipe_checks(self, df: pd.DataFrame) -> pd.DataFrame:
         if len(df) > 300:
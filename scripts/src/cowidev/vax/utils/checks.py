@@ -1,6 +1,7 @@
 from datetime import datetime
 from itertools import chain
 
+import numpy as np
 import pandas as pd
 
 
@@ -28,6 +29,13 @@ VACCINES_ACCEPTED = [
     "ZF2001",
 ]
 
+METRICS = [
+    "total_vaccinations",
+    "people_vaccinated",
+    "people_fully_vaccinated",
+    "total_boosters",
+]
+
 VACCINES_ONE_DOSE = [
     "Johnson&Johnson",
     "CanSino",
@@ -233,6 +241,208 @@ class CountryChecker:
         self.check_metrics()
 
 
+# Columns required in the data of each location (besides location and date)
+COLUMNS_REQUIRED = ["total_vaccinations", "vaccine", "source_url"]
+
+
+class BatchChecker:
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        monotonic_check_skip: dict = {},
+        anomalies: bool = True,
+        anomaly_check_skip: dict = {},
+        columns_missing: dict = None,
+    ):
+        """Run the checks from `CountryChecker` on all locations at once.
+
+        Instead of raising an error on the first issue, all violations are collected in a report (see `run`). To build
+        it from the frames of each location, use `from_locations`.
+
+        Args:
+            df (pd.DataFrame): Data from all locations.
+            monotonic_check_skip (dict, optional): Monotonicity violations to ignore, by location. Each location has a
+                                                    list of dictionaries `{"date": date, "metrics": metrics}`, as in
+                                                    the config file. Defaults to {}.
+            anomalies (bool, optional): Set to False to skip anomaly checks. Defaults to True.
+            anomaly_check_skip (dict, optional): Anomalies to ignore, by location. Same format as
+                                                    `monotonic_check_skip`. Defaults to {}.
+            columns_missing (dict, optional): Required columns missing from the frame of each location, if `df`
+                                                concatenates frames of several locations. Defaults to None (only
+                                                columns missing from `df` are reported, for all locations).
+        """
+        cols_missing = [col for col in ["location", "date"] if col not in df.columns]
+        if cols_missing:
+            raise ValueError(f"df missing column(s): {cols_missing}.")
+        metrics = [m for m in METRICS if m in df.columns]
+        self.df = (
+            df.assign(
+                date=pd.to_datetime(df.date),
+                **{m: df[m].astype("Float64").to_numpy(float, na_value=np.nan) for m in metrics},
+            )
+            .sort_values(["location", "date"], kind="mergesort")
+            .reset_index(drop=True)
+        )
+        self.metrics = metrics
+        self.anomalies = anomalies
+        self.skip_monocheck_index = self._skip_check_index(monotonic_check_skip)
+        self.skip_anomalcheck_index = self._skip_check_index(anomaly_check_skip)
+        self.columns_missing = columns_missing
+
+    @classmethod
+    def from_locations(cls, dfs: list, **kwargs):
+        """Checker for the concatenated frames `dfs` of each location.
+
+        Columns are concatenated as NaN for locations lacking them, so missing columns are checked on each frame
+        beforehand (`CountryChecker` raises for these). Keyword arguments are passed to `BatchChecker`.
+        """
+        columns_missing = {}
+        for df in dfs:
+            cols_missing = [col for col in COLUMNS_REQUIRED if col not in df.columns]
+            for location in df.location.dropna().unique():
+                columns_missing.setdefault(location, []).extend(cols_missing)
+        return cls(pd.concat(dfs, ignore_index=True), columns_missing=columns_missing, **kwargs)
+
+    def _skip_check_index(self, check_skip: dict) -> pd.MultiIndex:
+        records = [
+            (location, pd.Timestamp(x["date"]), metric)
+            for location, skips in check_skip.items()
+            for x in skips
+            for metric in (x["metrics"] if isinstance(x["metrics"], list) else [x["metrics"]])
+        ]
+        return pd.MultiIndex.from_frame(pd.DataFrame(records, columns=["location", "date", "metric"]))
+
+    def _violations(self, msk: pd.Series, check: str, metric: str = None, message="") -> pd.DataFrame:
+        return self.df.loc[msk, ["location", "date"]].assign(check=check, metric=metric, message=message)
+
+    def _drop_skipped(self, df: pd.DataFrame, skip_index: pd.MultiIndex) -> pd.DataFrame:
+        return df[~pd.MultiIndex.from_frame(df[["location", "date", "metric"]]).isin(skip_index)]
+
+    def check_column_names(self) -> list:
+        columns_missing = self.columns_missing
+        if columns_missing is None:
+            cols_missing = [col for col in COLUMNS_REQUIRED if col not in self.df.columns]
+            columns_missing = {location: cols_missing for location in self.df.location.unique()}
+        records = [
+            {"location": location, "check": "column_names", "message": f"Missing column {col}"}
+            for location, cols_missing in columns_missing.items()
+            for col in dict.fromkeys(cols_missing)
+        ]
+        return [pd.DataFrame(records)] if records else []
+
+    def check_source_url(self) -> list:
+        if "source_url" not in self.df:
+            return []
+        return [self._violations(self.df.source_url.isnull(), "source_url", message="NaN value")]
+
+    def check_vaccine(self) -> list:
+        if "vaccine" not in self.df:
+            return []
+        vaccines = pd.Series(self.df.vaccine.dropna().unique())
+        vaccines_wrong = (
+            vaccines.str.split(", ")
+            .explode()
+            .loc[lambda x: ~x.isin(VACCINES_ACCEPTED)]
+            .groupby(level=0)
+            .agg(", ".join)
+        )
+        vaccines_wrong.index = vaccines[vaccines_wrong.index]
+        wrong = self.df.vaccine.map(vaccines_wrong)
+        return [
+            self._violations(self.df.vaccine.isnull(), "vaccine", message="NaN value"),
+            self._violations(wrong.notnull(), "vaccine", message="Invalid vaccine(s): " + wrong[wrong.notnull()]),
+        ]
+
+    def check_date(self) -> list:
+        date = self.df.date
+        msk_range = (date < datetime(2020, 12, 1)) | (date.dt.date > datetime.now().date())
+        return [
+            self._violations(date.isnull(), "date", message="NaN value"),
+            self._violations(msk_range, "date", message="Date out of range"),
+            self._violations(self.df.duplicated(["location", "date"], keep=False), "date", message="Duplicated date"),
+        ]
+
+    def check_location(self) -> list:
+        return [self._violations(self.df.location.isnull(), "location", message="NaN value")]
+
+    def check_metrics_monotonic(self) -> list:
+        violations = []
+        for metric in self.metrics:
+            x = self.df.loc[self.df[metric].notnull(), ["location", metric]]
+            diff = x.groupby("location")[metric].diff()
+            msk = diff[diff < 0].index
+            message = (
+                "Must be monotonically increasing! Decreased from "
+                + (x.loc[msk, metric] - diff[msk]).astype(int).astype(str)
+                + " to "
+                + x.loc[msk, metric].astype(int).astype(str)
+            )
+            violations.append(self._violations(msk, "monotonic", metric, message))
+        return [self._drop_skipped(pd.concat(violations), self.skip_monocheck_index)]
+
+    def check_metrics_inequalities(self) -> list:
+        violations = []
+        for metric_1, metric_2 in [
+            ("total_vaccinations", "people_vaccinated"),
+            ("total_vaccinations", "people_fully_vaccinated"),
+            ("total_vaccinations", "total_boosters"),
+            ("people_vaccinated", "people_fully_vaccinated"),
+        ]:
+            if metric_1 in self.metrics and metric_2 in self.metrics:
+                msk = self.df[metric_1] < self.df[metric_2]
+                violations.append(
+                    self._violations(msk, "inequality", metric_1, f"{metric_1} can't be < {metric_2}!")
+                )
+        return violations
+
+    def check_metrics_anomalies(self, th: float = 6) -> list:
+        violations = []
+        for metric in self.metrics:
+            # Get metric values above 10,000
+            x = self.df.loc[self.df[metric] > 10000, ["location", "date", metric]]
+            # Compute rolling average, 7 days. NaNs are filled with non-smoothed values
+            m = x.groupby("location").rolling("7d", on="date", min_periods=2)[metric].mean()
+            m = pd.Series(m.to_numpy(), index=x.index).groupby(x.location).shift(1).fillna(x[metric])
+            # Compute ratio between rolling average and value
+            t = x[metric] / (m + 1e-9)
+            msk = t[t > th].index
+            message = (
+                "Potential anomaly! Value "
+                + x.loc[msk, metric].astype(int).astype(str)
+                + ", 7-day average "
+                + m[msk].round().astype(int).astype(str)
+                + ", ratio "
+                + t[msk].round(2).astype(str)
+            )
+            violations.append(self._violations(msk, "anomaly", metric, message))
+        return [self._drop_skipped(pd.concat(violations), self.skip_anomalcheck_index)]
+
+    def run(self) -> pd.DataFrame:
+        """Run all checks.
+
+        Returns:
+            pd.DataFrame: Report with one row per violation, with columns `location`, `date`, `check` (name of the
+                            check), `metric` (only for checks on metrics) and `message`. Empty if all checks passed.
+        """
+        violations = (
+            self.check_column_names()
+            + self.check_source_url()
+            + self.check_vaccine()
+            + self.check_date()
+            + self.check_location()
+            + self.check_metrics_monotonic()
+            + self.check_metrics_inequalities()
+        )
+        if self.anomalies:
+            violations += self.check_metrics_anomalies()
+        return (
+            pd.concat(violations, ignore_index=True)
+            .reindex(columns=["location", "date", "check", "metric", "message"])
+            .sort_values(["location", "date"], kind="mergesort")
+            .reset_index(drop=True)
+        )
+
+
 def validate_vaccines(df, vaccines_accepted, vaccines_raw=None):
     if vaccines_raw != None:
         vaccines_wrong = set(vaccines_raw).difference(vaccines_accepted)
@@ -1,10 +1,12 @@
+import io
 import os
 import datetime
 import re
 import numbers
 
 import pandas as pd
-import requests
+
+from cowidev.utils.web.session import fetch
 
 
 GH_LINK = "https://github.com/owid/covid-19-data/raw/master/public/data/vaccinations/country_data"
@@ -87,8 +89,10 @@ def _from_gh_to_scripts(paths, location):
     filepath_automated = paths.tmp_vax_out(location)
     filepath_public = f"{GH_LINK}/{location}.csv".replace(" ", "%20")
     # Move from public to output folder
-    if not os.path.isfile(filepath_automated) and requests.get(filepath_public).ok:
-        pd.read_csv(filepath_public).to_csv(filepath_automated, index=False)
+    if not os.path.isfile(filepath_automated):
+        response = fetch(filepath_public)
+        if response.ok:
+            pd.read_csv(io.BytesIO(response.content)).to_csv(filepath_automated, index=False)
 
 
 def _check_fields(
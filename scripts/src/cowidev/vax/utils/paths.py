@@ -2,8 +2,9 @@ import os
 
 
 class Paths:
-    def __init__(self, project_dir):
+    def __init__(self, project_dir, intermediate_format: str = "csv"):
         self.project_dir = project_dir
+        self.intermediate_format = intermediate_format
 
     @property
     def pub_data(self):
@@ -50,11 +51,35 @@ class Paths:
 
     @property
     def tmp_vax_all(self):
-        return os.path.join(self.tmp, "vaccinations.preliminary.csv")
+        return os.path.join(self.tmp, f"vaccinations.preliminary.{self.intermediate_format}")
 
     @property
     def tmp_met_all(self):
-        return os.path.join(self.tmp, "metadata.preliminary.csv")
+        return os.path.join(self.tmp, f"metadata.preliminary.{self.intermediate_format}")
+
+    @property
+    def tmp_vax_man_all(self):
+        return os.path.join(self.tmp, f"vaccinations-by-manufacturer.preliminary.{self.intermediate_format}")
+
+    @property
+    def tmp_vax_age_all(self):
+        return os.path.join(self.tmp, f"vaccinations-by-age-group.preliminary.{self.intermediate_format}")
+
+    @property
+    def tmp_vax_cache(self):
+        return os.path.join(self.tmp_vax_out_dir, "cache")
+
+    @property
+    def tmp_vax_cache_http(self):
+        return os.path.join(self.tmp_vax_cache, "http")
+
+    @property
+    def tmp_vax_cache_manifest(self):
+        return os.path.join(self.tmp_vax_cache, "manifest.json")
+
+    @property
+    def tmp_vax_cache_derived(self):
+        return os.path.join(self.tmp_vax_cache, "derived.pkl")
 
     @property
     def tmp_html(self):
@@ -83,3 +108,17 @@ class Paths:
 
     def tmp_vax_out_by_age_group(self, location):
         return os.path.join(self.tmp_vax_out_dir, "by_age_group", f"{location}.csv")
+
+    @property
+    def tmp_vax_man(self):
+        """Manufacturer data used by step `generate`. Consolidated by step `process` for columnar formats."""
+        if self.intermediate_format == "csv":
+            return self.tmp_vax_out_man("*")
+        return self.tmp_vax_man_all
+
+    @property
+    def tmp_vax_age(self):
+        """Age group data used by step `generate`. Consolidated by step `process` for columnar formats."""
+        if self.intermediate_format == "csv":
+            return self.tmp_vax_out_by_age_group("*")
+        return self.tmp_vax_age_all
@@ -0,0 +1,142 @@
+"""Intermediate files exchanged by vax steps (`process` → `generate`).
+
+Files are read and written according to their extension: `.csv`, `.parquet` or `.feather`. Columnar files are written
+with an explicit schema (see `SCHEMA_*`), so that the reading step does not have to parse text, infer dtypes or parse
+dates. Columnar formats require pyarrow, which is only imported when they are used.
+"""
+import os
+
+import pandas as pd
+
+
+FORMATS = ["csv", "parquet", "feather"]
+
+# Schema types (see `_arrow_type`)
+CATEGORY = "category"
+DATE = "date"
+INT = "int"
+FLOAT = "float"
+STRING = "string"
+BOOL = "bool"
+
+SCHEMA_VACCINATIONS = {
+    "location": CATEGORY,
+    "date": DATE,
+    "vaccine": CATEGORY,
+    "source_url": STRING,
+    "total_vaccinations": INT,
+    "people_vaccinated": INT,
+    "people_fully_vaccinated": INT,
+    "total_boosters": INT,
+    "people_partly_vaccinated": INT,
+}
+SCHEMA_METADATA = {
+    "location": STRING,
+    "source_name": STRING,
+    "automated": BOOL,
+    "include": BOOL,
+}
+SCHEMA_MANUFACTURER = {
+    "location": CATEGORY,
+    "date": DATE,
+    "vaccine": CATEGORY,
+    "total_vaccinations": INT,
+}
+SCHEMA_AGE = {
+    "location": CATEGORY,
+    "date": DATE,
+    "age_group_min": INT,
+    "age_group_max": INT,
+    "people_vaccinated_per_hundred": FLOAT,
+    "people_fully_vaccinated_per_hundred": FLOAT,
+}
+
+
+def file_format(path: str) -> str:
+    """Get format of file `path` from its extension."""
+    fmt = os.path.splitext(path)[1].lstrip(".")
+    if fmt not in FORMATS:
+        raise ValueError(f"Format not supported: {path}. Currently only {FORMATS} are accepted!")
+    return fmt
+
+
+def _arrow_type(name: str):
+    import pyarrow as pa
+
+    return {
+        CATEGORY: pa.dictionary(pa.int32(), pa.string()),
+        DATE: pa.date32(),
+        INT: pa.int64(),
+        FLOAT: pa.float64(),
+        STRING: pa.string(),
+        BOOL: pa.bool_(),
+    }[name]
+
+
+def _to_table(df: pd.DataFrame, schema: dict):
+    import pyarrow as pa
+
+    df = df.copy()
+    for col in df.columns:
+        if col not in schema and df[col].dtype == object:
+            # Columns without schema may have mixed types (e.g. spreadsheet fields)
+            df[col] = df[col].where(df[col].isnull(), df[col].astype(str))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    fields = [pa.field(f.name, _arrow_type(schema[f.name]) if f.name in schema else f.type) for f in table.schema]
+    return table.cast(pa.schema(fields))
+
+
+def write(df: pd.DataFrame, path: str, schema: dict):
+    """Write `df` to `path`, using `schema` if the format is columnar.
+
+    Args:
+        df (pd.DataFrame): Data.
+        path (str): Output file. Format is given by its extension.
+        schema (dict): Type of each column (e.g. `INT`). Columns not in schema keep their inferred type.
+    """
+    fmt = file_format(path)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(_to_table(df, schema), path)
+    elif fmt == "feather":
+        import pyarrow.feather as feather
+
+        feather.write_feather(_to_table(df, schema), path)
+
+
+def read(path: str, categories: bool = True) -> pd.DataFrame:
+    """Read file `path`, written with `write`.
+
+    CSV columns named `date` are parsed as dates. Columnar files keep the types from their schema: integer metrics as
+    `Int64`, dates as `datetime64` and dictionary-encoded columns as `category`.
+
+    Args:
+        path (str): File path. Format is given by its extension.
+        categories (bool, optional): Set to False to load categorical columns as object columns, as `pd.read_csv`
+                                        would. Defaults to True.
+
+    Returns:
+        pd.DataFrame: Data.
+    """
+    fmt = file_format(path)
+    if fmt == "csv":
+        df = pd.read_csv(path)
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"])
+        return df
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+    else:
+        import pyarrow.feather as feather
+
+        table = feather.read_table(path)
+    df = table.to_pandas(date_as_object=False, types_mapper={_arrow_type(INT): pd.Int64Dtype()}.get)
+    if not categories:
+        for col in df.select_dtypes("category").columns:
+            df[col] = df[col].astype(object)
+    return df